@@ -0,0 +1,178 @@
+"""
+Writes a synthetic Covid19Casos.csv with the columns of the msal file and similar distributions:
+cases by province, an epidemic curve, the ages and the hospitalisations and deaths that depend on them.
+
+    python -m benchmarks.generate --rows 1000000 [--output Covid19Casos.csv] [--seed 0]
+"""
+import argparse
+import os
+
+import django
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'covid_api.settings')
+django.setup()
+
+from covid_api.core.models import Province  # noqa: E402
+
+# Columns of the file, in its order
+COLUMNS = [
+    'id_evento_caso', 'sexo', 'edad', 'edad_años_meses', 'residencia_pais_nombre', 'residencia_provincia_nombre',
+    'residencia_departamento_nombre', 'carga_provincia_nombre', 'fecha_inicio_sintomas', 'fecha_apertura',
+    'sepi_apertura', 'fecha_internacion', 'cuidado_intensivo', 'fecha_cui_intensivo', 'fallecido',
+    'fecha_fallecimiento', 'asistencia_respiratoria_mecanica', 'carga_provincia_id', 'origen_financiamiento',
+    'clasificacion', 'clasificacion_resumen', 'residencia_provincia_id', 'fecha_diagnostico',
+    'residencia_departamento_id', 'ultima_actualizacion',
+]
+
+# Share of the cases loaded by each province, in thousandths
+PROVINCE_SHARES = {
+    '02': 190, '06': 470, '10': 3, '14': 55, '18': 5, '22': 15, '26': 10, '30': 15, '34': 1, '38': 20,
+    '42': 4, '46': 8, '50': 40, '54': 2, '58': 15, '62': 20, '66': 20, '70': 5, '74': 3, '78': 12,
+    '82': 60, '86': 7, '90': 35, '94': 10,
+}
+
+DEPARTMENTS = {
+    '02': [f'COMUNA {number:02}' for number in range(1, 16)],
+    '06': ['La Matanza', 'Lomas de Zamora', 'Quilmes', 'La Plata', 'Almirante Brown', 'Merlo', 'Lanús',
+           'General Pueyrredón', 'Moreno', 'Florencio Varela', 'Tigre', 'Avellaneda'],
+}
+OTHER_DEPARTMENTS = ['Capital', 'General San Martín', 'Rosario', 'Sin especificar']
+
+CLASSIFICATIONS = {
+    'Confirmado': (0.45, ['Caso confirmado por laboratorio', 'Caso confirmado por criterio clínico-epidemiológico']),
+    'Descartado': (0.50, ['Caso Descartado']),
+    'Sospechoso': (0.05, ['Caso sospechoso - En Estudio', 'Caso sospechoso - No Activo']),
+}
+
+FIRST_DAY = np.datetime64('2020-03-01')
+
+# Rows generated at a time, the memory used does not depend on the rows of the file
+CHUNK_ROWS = 500000
+
+
+def _dates(values, missing=None):
+    # Empty for NaT or where missing is set
+    dates = pd.Series(values).dt.strftime('%Y-%m-%d').fillna('').values
+    if missing is not None:
+        dates[missing] = ''
+    return dates
+
+
+def _flag(values):
+    return np.where(values, 'SI', 'NO')
+
+
+def _epidemic_curve(days):
+    # Cases opened each day grow until two thirds of the period and then slowly go down
+    day = np.arange(days)
+    peak = days * 2 // 3
+    curve = np.where(day <= peak, np.exp(6 * day / peak), np.exp(6) * np.exp(-2 * (day - peak) / days))
+    return curve / curve.sum()
+
+
+def generate_chunk(rng, rows, first_id, days, last_update):
+    slugs = np.array(list(PROVINCE_SHARES))
+    shares = np.array(list(PROVINCE_SHARES.values()), dtype=np.float64)
+    slug = rng.choice(slugs, rows, p=shares / shares.sum())
+    # Most cases live in the province that loads them
+    residence = np.where(rng.random(rows) < 0.95, slug, rng.choice(slugs, rows))
+    provinces = np.array([Province.PROVINCES[value] for value in slugs])
+
+    departments = np.empty(rows, dtype=object)
+    department_ids = np.empty(rows, dtype=np.int64)
+    for value in slugs:
+        living = residence == value
+        names = DEPARTMENTS.get(value, OTHER_DEPARTMENTS)
+        picked = rng.integers(0, len(names), living.sum())
+        departments[living] = np.array(names, dtype=object)[picked]
+        department_ids[living] = (picked + 1) * 7
+
+    opened = FIRST_DAY + rng.choice(days, rows, p=_epidemic_curve(days)).astype('timedelta64[D]')
+    opened.sort()
+    symptoms = opened - rng.integers(0, 8, rows).astype('timedelta64[D]')
+
+    summaries = np.array(list(CLASSIFICATIONS))
+    summary = rng.choice(summaries, rows, p=[share for share, _ in CLASSIFICATIONS.values()])
+    classification = np.empty(rows, dtype=object)
+    for value, (_, names) in CLASSIFICATIONS.items():
+        rows_of = summary == value
+        classification[rows_of] = np.array(names, dtype=object)[rng.integers(0, len(names), rows_of.sum())]
+    confirmed = summary == 'Confirmado'
+
+    age = np.clip(rng.normal(38, 19, rows), 0, 105).round()
+    months = rng.random(rows) < 0.01
+    age[months] = rng.integers(1, 12, months.sum())
+
+    # Hospitalisations and deaths of the confirmed cases grow with the age
+    risk = 1 / (1 + np.exp(-(age - 85) / 9))
+    risk[months] = 0.001
+    hospitalised = confirmed & (rng.random(rows) < 0.05 + risk)
+    intensive = hospitalised & (rng.random(rows) < 0.25)
+    respirator = intensive & (rng.random(rows) < 0.5)
+    death = opened + rng.integers(3, 30, rows).astype('timedelta64[D]')
+    dead = confirmed & (rng.random(rows) < risk) & (death <= last_update)
+
+    admission = np.where(hospitalised, opened + rng.integers(0, 4, rows).astype('timedelta64[D]'), np.datetime64('NaT'))
+    death = np.where(dead, death, np.datetime64('NaT'))
+    diagnosis = opened + rng.integers(0, 3, rows).astype('timedelta64[D]')
+    diagnosis[diagnosis > last_update] = last_update
+
+    return pd.DataFrame({
+        'id_evento_caso': first_id + np.arange(rows) * 3 + rng.integers(0, 3, rows),
+        'sexo': rng.choice(['F', 'M', 'NR'], rows, p=[0.5, 0.495, 0.005]),
+        'edad': np.where(rng.random(rows) < 0.005, np.nan, age),
+        'edad_años_meses': np.where(months, 'Meses', 'Años'),
+        'residencia_pais_nombre': np.where(rng.random(rows) < 0.995, 'Argentina', 'SIN ESPECIFICAR'),
+        'residencia_provincia_nombre': provinces[np.searchsorted(slugs, residence)],
+        'residencia_departamento_nombre': departments,
+        'carga_provincia_nombre': provinces[np.searchsorted(slugs, slug)],
+        'fecha_inicio_sintomas': _dates(symptoms, missing=rng.random(rows) < 0.1),
+        'fecha_apertura': _dates(opened),
+        'sepi_apertura': (opened - np.datetime64('2019-12-29')).astype(np.int64) // 7 % 53 + 1,
+        'fecha_internacion': _dates(admission),
+        'cuidado_intensivo': _flag(intensive),
+        'fecha_cui_intensivo': _dates(np.where(intensive, admission, np.datetime64('NaT'))),
+        'fallecido': _flag(dead),
+        'fecha_fallecimiento': _dates(death),
+        'asistencia_respiratoria_mecanica': _flag(respirator),
+        'carga_provincia_id': slug.astype(np.int64),
+        'origen_financiamiento': rng.choice(['Público', 'Privado'], rows, p=[0.65, 0.35]),
+        'clasificacion': classification,
+        'clasificacion_resumen': summary,
+        'residencia_provincia_id': residence.astype(np.int64),
+        # Half of the cases that are not confirmed have no diagnosis
+        'fecha_diagnostico': _dates(diagnosis, missing=~confirmed & (rng.random(rows) < 0.5)),
+        'residencia_departamento_id': department_ids,
+        'ultima_actualizacion': str(last_update),
+    }, columns=COLUMNS)
+
+
+def generate(path, rows, seed=0, last_update='2020-10-31'):
+    """
+    Writes rows synthetic cases to path, opened from 2020-03-01 until last_update
+    """
+    rng = np.random.default_rng(seed)
+    last_update = np.datetime64(last_update)
+    days = int((last_update - FIRST_DAY).astype(np.int64)) + 1
+
+    with open(path, 'w', encoding='utf-8', newline='') as csv_file:
+        for start in range(0, rows, CHUNK_ROWS):
+            chunk = generate_chunk(rng, min(CHUNK_ROWS, rows - start), 1000 + start * 3, days, last_update)
+            chunk.to_csv(csv_file, index=False, header=start == 0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--output', default='Covid19Casos.csv')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--last-update', default='2020-10-31')
+    args = parser.parse_args()
+
+    generate(args.output, args.rows, args.seed, args.last_update)
+
+
+if __name__ == '__main__':
+    main()
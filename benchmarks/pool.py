@@ -0,0 +1,63 @@
+"""
+Measures the summaries answered per second by the query pool with 1 to N worker processes,
+against running them in the threads of the server. The summaries count the cases, not the cube,
+and are requested by as many threads as workers.
+
+    python -m benchmarks.pool [--workers 4] [--queries 40]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+import pandas as pd
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'covid_api.settings')
+django.setup()
+
+from covid_api.core.services import CovidService, pool  # noqa: E402
+
+
+def country():
+    data = CovidService.get_data().filter_eq('clasificacion_resumen', 'Confirmado')
+    return CovidService.summary([], None, None, data).data_frame
+
+
+def provinces():
+    data = CovidService.get_data().filter_eq('clasificacion_resumen', 'Confirmado')
+    return pd.concat(CovidService.province_summaries(None, None, data))
+
+
+def throughput(query, threads, queries):
+    with ThreadPoolExecutor(threads) as clients:
+        start = time.perf_counter()
+        list(clients.map(lambda _: query(), range(queries)))
+        return queries / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--queries', type=int, default=40)
+    args = parser.parse_args()
+
+    print(f"{'query':<10}{'workers':>8}{'threads_qps':>14}{'pool_qps':>12}{'speedup':>10}")
+    for name, query in (('country', country), ('provinces', provinces)):
+        pool.configure(0)
+        expected = query()
+        for workers in range(1, args.workers + 1):
+            pool.configure(0)
+            threads_qps = throughput(query, workers, args.queries)
+
+            pool.configure(workers)
+            pd.testing.assert_frame_equal(query(), expected)
+            # Starts every worker and loads its dataset before timing
+            throughput(query, workers, workers * 2)
+            pool_qps = throughput(query, workers, args.queries)
+            print(f'{name:<10}{workers:>8}{threads_qps:>14.1f}{pool_qps:>12.1f}{pool_qps / threads_qps:>9.1f}x')
+    pool.configure(0)
+
+
+if __name__ == '__main__':
+    main()
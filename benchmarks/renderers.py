@@ -0,0 +1,64 @@
+"""
+Compares the DataFrame renderers with the previous path, DataFrameWrapper.to_json parsed
+back into dicts and serialised again by JSONRenderer and CSVRenderer.
+
+    python -m benchmarks.renderers [--repeat 5]
+"""
+import argparse
+import os
+import timeit
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'covid_api.settings')
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework_csv.renderers import CSVRenderer  # noqa: E402
+
+from covid_api.core.renderers import DataFrameCSVRenderer, DataFrameJSONRenderer  # noqa: E402
+from covid_api.core.services import CovidService  # noqa: E402
+
+
+def cases():
+    return CovidService.get_data().filter_eq('carga_provincia_nombre', 'Buenos Aires')
+
+
+def summary():
+    return CovidService.summary([], None, None, CovidService.get_aggregated_data())
+
+
+RESULTS = {
+    'cases': cases,
+    'summary': summary,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'result':<10}{'format':<8}{'rows':>10}{'before_ms':>12}{'after_ms':>12}{'speedup':>10}")
+    for name, result in RESULTS.items():
+        data = result()
+        for format_name, before, after in (
+            ('json', JSONRenderer(), DataFrameJSONRenderer()),
+            ('csv', CSVRenderer(), DataFrameCSVRenderer()),
+        ):
+            def render_before():
+                return before.render(data.to_json())
+
+            def render_after():
+                return after.render(data.to_frame())
+
+            assert render_before() == render_after(), f'{name} {format_name} output changed'
+            before_ms = min(timeit.repeat(render_before, number=1, repeat=args.repeat)) * 1000
+            after_ms = min(timeit.repeat(render_after, number=1, repeat=args.repeat)) * 1000
+            rows = data.count() if name == 'cases' else len(data.data_frame.index)
+            speedup = before_ms / after_ms
+            print(f'{name:<10}{format_name:<8}{rows:>10}{before_ms:>12.1f}{after_ms:>12.1f}{speedup:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Times the services and every view of the API on a Covid19Casos.csv, the downloaded one or one written
+by benchmarks.generate, and stores the results to compare them between commits.
+
+    python -m benchmarks.suite [--data Covid19Casos.csv] [--repeat 5] [--compare benchmarks/results/<file>.json]
+
+The snapshot of the data is built in a temporary directory, the snapshot of the API is not touched.
+Each case reports its best and median wall time, and the peak of the memory it allocates, traced in a
+separate run. The results are written to benchmarks/results/<commit>-<rows>.json.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmarks', 'results')
+
+
+def measure(function, repeat, setup=None):
+    """
+    Returns the wall times of repeat calls of function and the peak of the memory allocated by one of them.
+    setup returns the arguments of each call and is not timed.
+    """
+    def arguments():
+        return setup() if setup else ()
+
+    args = arguments()
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(repeat):
+        args = arguments()
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+
+    return {
+        'min_ms': round(min(times) * 1000, 3),
+        'median_ms': round(statistics.median(times) * 1000, 3),
+        'peak_mb': round(peak / 1024 / 1024, 3),
+    }
+
+
+def commit():
+    # The commit of the tree, marked as dirty if it has changes
+    def git(*args):
+        return subprocess.check_output(['git', *args], cwd=BASE_DIR, stderr=subprocess.DEVNULL, text=True)
+
+    try:
+        head = git('rev-parse', '--short', 'HEAD').strip()
+        changes = git('status', '--porcelain', '--untracked-files=no')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f'{head}-dirty' if changes.strip() else head
+
+
+def cases(snapshot_dir):
+    """
+    Returns the name, function and setup of each case, in the order they run
+    """
+    from django.test import Client
+    from django.urls import reverse
+
+    from covid_api.core import urls
+    from covid_api.core.cache import response_cache
+    from covid_api.core.services import CovidService, snapshot
+    from covid_api.core.services.dataset import Dataset
+    from covid_api.settings import COVID_DATA_LOADING
+
+    def clean_snapshot():
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        return ()
+
+    def manifest():
+        return snapshot_dir, snapshot.read_manifest(snapshot_dir), COVID_DATA_LOADING == 'mmap'
+
+    def confirmed():
+        return CovidService.get_data().filter_eq('clasificacion_resumen', 'Confirmado'),
+
+    def count(name, column, value):
+        def function():
+            return getattr(CovidService.get_data(), name)(column, value).count()
+        return function
+
+    def request(url):
+        # Built each time, not answered by the response cache
+        def setup():
+            response_cache.clear()
+            return url,
+        return setup
+
+    yield 'ingest', CovidService.build_snapshot, clean_snapshot
+    yield 'load', Dataset.load, manifest
+    CovidService.dataset()
+    yield 'get_data', CovidService.get_data, None
+    yield 'get_aggregated_data', CovidService.get_aggregated_data, None
+
+    filters = {
+        'filter_eq': ('clasificacion_resumen', 'Confirmado'),
+        'filter_ge': ('fecha_diagnostico', '2020-06-01'),
+        'filter_le': ('fecha_fallecimiento', '2020-07-01'),
+        'filter_gt': ('id_evento_caso', 500000),
+    }
+    for name, (column, value) in filters.items():
+        yield f'{name}[{column}]', count(name, column, value), None
+
+    yield 'summary[country]', lambda data: CovidService.summary([], None, None, data), confirmed
+    yield 'summary[province]', lambda data: CovidService.summary(
+        ['carga_provincia_nombre'], None, None, data.filter_eq('carga_provincia_nombre', 'Buenos Aires')
+    ), confirmed
+    yield 'summary[cube]', lambda: CovidService.summary([], None, None, CovidService.get_aggregated_data()), None
+    yield 'province_summaries', lambda data: CovidService.province_summaries(None, None, data), confirmed
+
+    summary = CovidService.summary([], None, None, CovidService.get_aggregated_data())
+    yield 'population_summary_metrics', CovidService.population_summary_metrics, lambda: (summary, None)
+
+    client = Client()
+
+    def get(url):
+        response = client.get(url)
+        assert response.status_code == 200, f'{url} answered {response.status_code}'
+
+    for pattern in urls.urlpatterns:
+        # Reversed by view, some patterns share a name and the regex ones are not urls
+        kwargs = {name: '06' for name in pattern.pattern.regex.groupindex}
+        url = reverse(pattern.callback, kwargs=kwargs)
+        yield f'view[{url}]', get, request(url)
+
+
+def compare(previous, results):
+    print(f"\n{'case':<44}{'before_ms':>12}{'after_ms':>12}{'ratio':>8}{'before_mb':>12}{'after_mb':>11}")
+    for name, after in results['cases'].items():
+        before = previous['cases'].get(name)
+        if before is None:
+            continue
+        ratio = after['min_ms'] / before['min_ms'] if before['min_ms'] else float('nan')
+        print(
+            f"{name:<44}{before['min_ms']:>12.1f}{after['min_ms']:>12.1f}{ratio:>7.2f}x"
+            f"{before['peak_mb']:>12.1f}{after['peak_mb']:>11.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', help='Covid19Casos.csv to use, COVID_FILE_NAME by default')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--results', default=RESULTS_DIR)
+    parser.add_argument('--compare', help='results of a previous run to compare with')
+    args = parser.parse_args()
+
+    snapshot_dir = tempfile.mkdtemp(prefix='covid-benchmark-')
+    if args.data:
+        os.environ['COVID_FILE_NAME'] = os.path.abspath(args.data)
+    os.environ['COVID_SNAPSHOT_DIR'] = snapshot_dir
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'covid_api.settings')
+
+    import django
+    django.setup()
+
+    import numpy as np
+    import pandas as pd
+
+    from covid_api.core.services import CovidService
+    from covid_api.settings import COVID_FILE_NAME
+
+    results = {
+        'commit': commit(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'data': COVID_FILE_NAME,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cases': {},
+    }
+    try:
+        print(f"{'case':<44}{'min_ms':>10}{'median_ms':>11}{'peak_mb':>9}")
+        for name, function, setup in cases(snapshot_dir):
+            result = measure(function, args.repeat, setup)
+            results['cases'][name] = result
+            print(f"{name:<44}{result['min_ms']:>10.1f}{result['median_ms']:>11.1f}{result['peak_mb']:>9.1f}")
+            sys.stdout.flush()
+        results['rows'] = len(CovidService.dataset().data_frame.index)
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+    os.makedirs(args.results, exist_ok=True)
+    path = os.path.join(args.results, f"{results['commit']}-{results['rows']}.json")
+    with open(path, 'w', encoding='utf-8') as results_file:
+        json.dump(results, results_file, indent=2, ensure_ascii=False)
+    print(f'\nResults written to {path}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as previous_file:
+            compare(json.load(previous_file), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Compares CovidService.summary and population_summary_metrics with the implementation before the snapshots:
+the cases as read from Covid19Casos.csv, with the types pandas infers, filtered with loc, counted with
+groupby().count() and merged onto the date range.
+
+    python -m benchmarks.summary [--repeat 5]
+"""
+import argparse
+import os
+import timeit
+
+import django
+import pandas as pd
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'covid_api.settings')
+django.setup()
+
+from covid_api.core.services import CovidService  # noqa: E402
+from covid_api.settings import COVID_FILE_NAME  # noqa: E402
+
+
+class PreviousDataFrameWrapper:
+    """
+    The DataFrameWrapper of the previous implementation, each filter copies the rows that pass it
+    """
+
+    def __init__(self, data_frame):
+        self.data_frame = data_frame
+
+    def filter_eq(self, column, value):
+        self.data_frame = self.data_frame.loc[self.data_frame[column] == value]
+        return self
+
+
+def previous_summary(group_by_vector, start_date, end_date, data, cases):
+    start_date = start_date if start_date else '2020-02-11'
+
+    if not end_date:
+        end_date = cases['ultima_actualizacion'].max()
+
+    summary = data.data_frame
+
+    raw_range = pd.date_range(start=start_date, end=end_date)
+    range_strings = raw_range.format(formatter=lambda x: x.strftime('%Y-%m-%d'))
+    df = pd.DataFrame(range_strings, columns=['fecha_diagnostico'])
+
+    cases_count = summary.groupby(
+        [elem for elem in group_by_vector] + ['fecha_diagnostico'],
+        as_index=False
+    ).count()
+    df2 = cases_count[['fecha_diagnostico']].copy()
+    df2['casos'] = cases_count['id_evento_caso']
+
+    summary = summary.loc[summary['fallecido'] == 'SI']
+    deaths_count = summary.groupby(
+        [elem for elem in group_by_vector] + ['fecha_fallecimiento'],
+        as_index=False
+    ).count()[['fecha_fallecimiento', 'id_evento_caso']]
+    deaths_count = deaths_count.rename(
+        columns={'id_evento_caso': "muertes", 'fecha_fallecimiento': "fecha_diagnostico"})
+
+    df = df.merge(df2, on='fecha_diagnostico', how='left')
+    df = df.merge(deaths_count, on='fecha_diagnostico', how='left')
+
+    df = df.fillna(value=0)
+
+    df['muertes_acum'] = df['muertes'].cumsum()
+    df['casos_acum'] = df['casos'].cumsum()
+
+    df = df.rename(
+        columns={'fecha_diagnostico': "fecha"})
+
+    return PreviousDataFrameWrapper(df)
+
+
+def previous_population_summary_metrics(dfw, slug):
+    # The population of the compiled registry, the workbook used to be parsed on each call
+    population = CovidService.population_per_province()[slug or 'ARG']
+    df = dfw.data_frame
+    for column in ['casos', 'muertes', 'casos_acum', 'muertes_acum']:
+        df[f'{column}_cada_cien_mil'] = round(df[column] * 100000 / population)
+    for column in ['casos', 'muertes', 'casos_acum', 'muertes_acum']:
+        df[f'{column}_por_millón'] = round(df[column] * 1000000 / population)
+    return dfw
+
+
+def country(summary, metrics, data):
+    return metrics(summary([], None, None, data), None)
+
+
+def province(summary, metrics, data):
+    data = data.filter_eq('carga_provincia_nombre', 'Buenos Aires')
+    return metrics(summary(['carga_provincia_nombre'], '2020-04-01', None, data), '06')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # The cases as the previous implementation held them
+    cases = pd.read_csv(COVID_FILE_NAME, encoding='utf-8')
+
+    def summary_before(group_by_vector, start_date, end_date, data):
+        return previous_summary(group_by_vector, start_date, end_date, data, cases)
+
+    sources = {
+        'cases': CovidService.get_data,
+        'cube': CovidService.get_aggregated_data,
+    }
+    print(f"{'summary':<10}{'source':<8}{'before_ms':>12}{'after_ms':>12}{'speedup':>10}")
+    for name, summary in (('country', country), ('province', province)):
+        def before():
+            return summary(summary_before, previous_population_summary_metrics, PreviousDataFrameWrapper(cases))
+
+        for source, get_data in sources.items():
+            def after():
+                return summary(CovidService.summary, CovidService.population_summary_metrics, get_data())
+
+            pd.testing.assert_frame_equal(before().data_frame, after().data_frame)
+            before_ms = min(timeit.repeat(before, number=1, repeat=args.repeat)) * 1000
+            after_ms = min(timeit.repeat(after, number=1, repeat=args.repeat)) * 1000
+            print(f'{name:<10}{source:<8}{before_ms:>12.1f}{after_ms:>12.1f}{before_ms / after_ms:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,13 +4,22 @@ ASGI config for covid_api project.
 It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
-https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
+https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
 """
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'covid_api.settings')
+# Route the requests to the async views, see core/async_views.py
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
-application = get_asgi_application()
+application = ASGIStaticFilesHandler(get_asgi_application())
+
+if settings.COVID_PRELOAD:
+    # Under gunicorn --preload the master loads the data and the workers it forks share it
+    from covid_api.core.warmup import warm_up
+    warm_up()
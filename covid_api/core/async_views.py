@@ -0,0 +1,87 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+
+from .cache import cached
+from .profiling import PROFILE_PARAM
+from .services import CovidService
+from covid_api.settings import ASYNC_VIEW_WORKERS
+
+# Bounded pool for the pandas work of the views, the event loop keeps answering the cheap requests meanwhile
+executor = ThreadPoolExecutor(max_workers=ASYNC_VIEW_WORKERS, thread_name_prefix='covid-view')
+
+
+def _run(view, request, *args, **kwargs):
+    # Rendered here so the serialisation also runs out of the event loop
+    response = view(request, *args, **kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    if response.streaming:
+        # Django iterates a stream on the event loop, it is joined here instead and sent whole
+        streamed = response
+        response = HttpResponse(b''.join(streamed.streaming_content), status=streamed.status_code)
+        for header, value in streamed.items():
+            response[header] = value
+        streamed.close()
+    return response
+
+
+def _run_in_executor(view, request, *args, **kwargs):
+    # The threads of the executor outlive the requests, as a request of the sync server they close
+    # the connections to the database that are too old or broken, before and after the view
+    close_old_connections()
+    try:
+        return _run(view, request, *args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def _cached(view, request, **kwargs):
+    """
+    Returns the response of the cache for the request, None if the view has to build it
+    """
+    if request.method != 'GET' or not getattr(view.cls.get, 'cached_response', False):
+        return None
+    if PROFILE_PARAM in request.GET:
+        # Answered by the profiled view, which removes the parameter
+        return None
+
+    instance = view.cls(**view.initkwargs)
+    instance.args, instance.kwargs = (), kwargs
+    drf_request = instance.initialize_request(request, **kwargs)
+    instance.format_kwarg = instance.get_format_suffix(**kwargs)
+    try:
+        drf_request.accepted_renderer, drf_request.accepted_media_type = \
+            instance.perform_content_negotiation(drf_request)
+    except APIException:
+        return None
+
+    _, response = cached(instance, drf_request, CovidService.dataset().version, **kwargs)
+    return response
+
+
+def async_view(view, cheap=False):
+    """
+    Returns an async version of a view returned by APIView.as_view, to be served through ASGI.
+    Cheap views and the cached responses are answered on the event loop,
+    anything else runs in the executor.
+    """
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # The first load of the data blocks, it can not run on the event loop
+        if CovidService.is_loaded():
+            if cheap:
+                return _run(view, request, *args, **kwargs)
+            response = _cached(view, request, **kwargs)
+            if response is not None:
+                return response
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(executor, functools.partial(_run_in_executor, view, request, *args, **kwargs))
+
+    return wrapper
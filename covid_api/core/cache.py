@@ -0,0 +1,135 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+from covid_api.core import metrics
+from covid_api.core.services import CovidService
+from covid_api.settings import RESPONSE_CACHE_BYTES
+
+
+class ResponseCache:
+    """
+    LRU cache of rendered responses, limited by the bytes of their content.
+    The entries belong to a data version, they are dropped as soon as a newer version is seen.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self.version:
+            self._entries.clear()
+            self.size = 0
+            self.version = version
+
+    def get(self, version, key):
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, version, key, content, headers):
+        if len(content) > self.max_bytes:
+            return
+        with self._lock:
+            self._check_version(version)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[0])
+            self._entries[key] = (content, headers)
+            self.size += len(content)
+
+            # Evict the least recently used responses
+            while self.size > self.max_bytes:
+                _, (content, _) = self._entries.popitem(last=False)
+                self.size -= len(content)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_BYTES)
+
+
+def response_etag(view, request, version, **kwargs):
+    """
+    Returns a strong ETag for the view, its url arguments, the query parameters,
+    the renderer, the accepted media type with its parameters (as indent) and the data version
+    """
+    key = (
+        type(view).__name__,
+        sorted(kwargs.items()),
+        sorted((param, sorted(values)) for param, values in request.GET.lists()),
+        request.accepted_renderer.format,
+        request.accepted_media_type,
+        version,
+    )
+    return '"{}"'.format(hashlib.sha1(repr(key).encode('utf-8')).hexdigest())
+
+
+def cached(view, request, version, **kwargs):
+    """
+    Returns the ETag of the request and the response answering it without building it:
+    a 304 if the client has the current ETag, the cached response, or None
+    """
+    etag = response_etag(view, request, version, **kwargs)
+
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        entry = response_cache.get(version, etag)
+        if entry is None:
+            return etag, None
+        content, headers = entry
+        response = HttpResponse(content)
+        for header, value in headers:
+            response[header] = value
+
+    response['ETag'] = etag
+    return etag, response
+
+
+def cached_response(get):
+    """
+    Decorates the get of an APIView to answer from the response cache.
+    Requests with the current ETag in If-None-Match get a 304 without rendering anything.
+    """
+
+    @wraps(get)
+    def wrapper(view, request, **kwargs):
+        timings = metrics.timings(request)
+        # The first load of the data, later ones run in the background
+        with timings.stage('dataset'):
+            version = CovidService.dataset().version
+        with timings.stage('cache'):
+            etag, response = cached(view, request, version, **kwargs)
+        if response is not None:
+            return response
+
+        response = get(view, request, **kwargs)
+        if response.status_code != 200 or response.streaming:
+            return response
+        with timings.stage('render'):
+            response = view.finalize_response(request, response, **kwargs)
+            response.render()
+        # The data may have been reloaded while the response was built
+        if CovidService.version == version:
+            response_cache.set(version, etag, response.content, list(response.items()))
+
+        response['ETag'] = etag
+        return response
+
+    wrapper.cached_response = True
+    return wrapper
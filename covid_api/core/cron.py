@@ -5,5 +5,12 @@ from covid_api.core.services import CovidService
 
 def update_data():
     print(f"Start updating file at: {datetime.now()}")
-    CovidService.update_data()
+    stats = CovidService.update_data()
+    if stats is None:
+        print("The file has not changed")
+    else:
+        print(f"Ingested {stats['rows']} rows in {stats['seconds']:.1f}s "
+              f"({stats['rows_per_second']:.0f} rows/sec, peak RSS {stats['peak_rss_mb']} MB)")
+        print(f"{stats['mode'].capitalize()} ingest: {stats['inserted']} inserted and "
+              f"{stats['updated']} updated cases, version {stats['version']}")
     print(f"Finish updating file at: {datetime.now()}")
@@ -0,0 +1,22 @@
+import pandas as pd
+from django.core.management import BaseCommand
+
+from covid_api.core.services import schema
+from covid_api.settings import COVID_FILE_NAME
+
+
+class Command(BaseCommand):
+    help = 'Compare the memory used by the COVID-19 data as parsed by read_csv and with the schema types'
+
+    def handle(self, *args, **options):
+        data_frame = pd.read_csv(COVID_FILE_NAME, encoding='utf-8')
+        before = schema.memory_report(data_frame)
+        after = schema.memory_report(schema.normalise(data_frame))
+
+        report = before.join(after, lsuffix='_before', rsuffix='_after')
+        report.loc['TOTAL', ['bytes_before', 'bytes_after']] = [before['bytes'].sum(), after['bytes'].sum()]
+        report['bytes_before'] = (report['bytes_before'] / 2 ** 20).round(2)
+        report['bytes_after'] = (report['bytes_after'] / 2 ** 20).round(2)
+        report = report.rename(columns={'bytes_before': 'mb_before', 'bytes_after': 'mb_after'})
+
+        self.stdout.write(report.fillna('').to_string())
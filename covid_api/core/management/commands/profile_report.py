@@ -0,0 +1,47 @@
+from collections import Counter
+
+from django.core.management import BaseCommand
+
+from covid_api.core import profiling
+from covid_api.settings import PROFILE_DIR
+
+
+class Command(BaseCommand):
+    help = 'Summarise the slowest functions and the top allocators of the profiled requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=PROFILE_DIR, help='directory of the profiles')
+        parser.add_argument('--view', help='only the profiles of this view, as ListView')
+        parser.add_argument('--data-version', help='only the profiles of this data version')
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--sort', default='cumulative', choices=['cumulative', 'tottime', 'calls'])
+
+    def handle(self, *args, **options):
+        paths = []
+        views = Counter()
+        for path in profiling.list_dumps(options['dir']):
+            meta = profiling.read_meta(path)
+            if options['view'] and meta['view'] != options['view']:
+                continue
+            if options['data_version'] and meta['version'] != options['data_version']:
+                continue
+            paths.append(path)
+            views[meta['view']] += 1
+
+        if not paths:
+            self.stdout.write(f"No profiles in {options['dir']}")
+            return
+
+        counts = ', '.join(f'{view} {count}' for view, count in views.most_common())
+        self.stdout.write(f'{len(paths)} profiles: {counts}')
+
+        self.stdout.write(f"\nFunctions by {options['sort']} time, over all the profiles")
+        self.stdout.write(f"{'calls':>10}{'own_s':>10}{'cumulative_s':>14}  function")
+        functions = profiling.top_functions(paths, options['sort'], options['top'])
+        for calls, own_time, cumulative_time, function in functions:
+            self.stdout.write(f'{calls:>10}{own_time:>10.3f}{cumulative_time:>14.3f}  {function}')
+
+        self.stdout.write('\nMemory held at the end of the requests, by the line of the API that allocated it')
+        self.stdout.write(f"{'mb':>10}{'blocks':>10}  location")
+        for location, size, count in profiling.top_allocators(paths, options['top']):
+            self.stdout.write(f'{size / 2 ** 20:>10.2f}{count:>10}  {location}')
@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Upper bounds of the buckets of the durations, in seconds
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RELOAD_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class Timings:
+    """
+    Durations of the stages of a request, in the order they ran, and the rows it read and returned
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = []
+        self.rows_scanned = None
+        self.rows_returned = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - start))
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def header(self, total):
+        """
+        Returns the value of the Server-Timing header, with the durations in milliseconds
+        """
+        metrics = [f'{name};dur={seconds * 1000:.3f}' for name, seconds in self.stages]
+        metrics.append(f'total;dur={total * 1000:.3f}')
+        for name in ('rows_scanned', 'rows_returned'):
+            rows = getattr(self, name)
+            if rows is not None:
+                metrics.append(f'{name};desc="{rows}"')
+        return ', '.join(metrics)
+
+
+def timings(request):
+    # Set by MetricsMiddleware, views called without it record into a throwaway one
+    return getattr(request, 'timings', None) or Timings()
+
+
+def view_name(view):
+    # The class of the views made by as_view, also when they are wrapped
+    view_class = getattr(view, 'cls', None) or getattr(view, 'view_class', None)
+    return (view_class or view).__name__
+
+
+def returned_rows(data):
+    """
+    Returns the rows of the data of a response, None if it is not a table
+    """
+    if isinstance(data, pd.DataFrame):
+        return len(data.index)
+    if isinstance(data, dict) and data and all(isinstance(value, pd.DataFrame) for value in data.values()):
+        return sum(len(value.index) for value in data.values())
+    if isinstance(data, list):
+        return len(data)
+    return None
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+class Counter:
+    """
+    Prometheus counter with a series for each value of its labels
+    """
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *values):
+        with self._lock:
+            self._series[values] = self._series.get(values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for values, total in sorted(self._series.items()):
+                lines.append(f'{self.name}{_labels(self.labels, values)} {total}')
+        return lines
+
+
+class Histogram:
+    """
+    Prometheus histogram with a series for each value of its labels
+    """
+
+    def __init__(self, name, documentation, labels=(), buckets=REQUEST_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Label values to the count of each bucket, the sum and the count of the observations
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *values):
+        with self._lock:
+            counts, total, count = self._series.get(values, ([0] * len(self.buckets), 0.0, 0))
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[position] += 1
+                    break
+            self._series[values] = (counts, total + value, count + 1)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        names = self.labels + ('le',)
+        with self._lock:
+            for values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, counts):
+                    cumulative += bucket
+                    lines.append(f'{self.name}_bucket{_labels(names, values + (bound,))} {cumulative}')
+                lines.append(f'{self.name}_bucket{_labels(names, values + ("+Inf",))} {count}')
+                lines.append(f'{self.name}_sum{_labels(self.labels, values)} {total}')
+                lines.append(f'{self.name}_count{_labels(self.labels, values)} {count}')
+        return lines
+
+
+def gauge(name, documentation, value, **labels):
+    return [
+        f'# HELP {name} {documentation}',
+        f'# TYPE {name} gauge',
+        f'{name}{_labels(tuple(labels), tuple(labels.values()))} {value}',
+    ]
+
+
+request_duration = Histogram(
+    'covid_api_request_duration_seconds', 'Time to answer the requests of each view.', ['view']
+)
+stage_duration = Histogram(
+    'covid_api_request_stage_duration_seconds', 'Time of each stage of the requests of each view.', ['view', 'stage']
+)
+rows_scanned = Counter(
+    'covid_api_rows_scanned_total', 'Rows of the data the requests of each view were filtered from.', ['view']
+)
+rows_returned = Counter('covid_api_rows_returned_total', 'Rows returned by the requests of each view.', ['view'])
+dataset_reload = Histogram(
+    'covid_api_dataset_reload_duration_seconds', 'Time to load each version of the data.', buckets=RELOAD_BUCKETS
+)
+
+
+def record(view, request_timings, total):
+    request_duration.observe(total, view)
+    for stage, seconds in request_timings.stages:
+        stage_duration.observe(seconds, view, stage)
+    if request_timings.rows_scanned is not None:
+        rows_scanned.inc(request_timings.rows_scanned, view)
+    if request_timings.rows_returned is not None:
+        rows_returned.inc(request_timings.rows_returned, view)
+
+
+def resident_memory_bytes():
+    # Current resident set of the process, only known on Linux
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def render(*gauges):
+    """
+    Returns the metrics of the process and the given gauges in the Prometheus text format
+    """
+    lines = []
+    for metric in (request_duration, stage_duration, rows_scanned, rows_returned, dataset_reload):
+        lines += metric.render()
+    memory = resident_memory_bytes()
+    if memory is not None:
+        lines += gauge('process_resident_memory_bytes', 'Resident memory size in bytes.', memory)
+    for metric in gauges:
+        lines += metric
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,36 @@
+from django.utils.deprecation import MiddlewareMixin
+
+from covid_api.core import metrics
+from covid_api.core.services import CovidService
+
+
+class DataVersionMiddleware(MiddlewareMixin):
+    """
+    Adds the version of the data being served to the responses, as X-Data-Version
+    """
+
+    def process_response(self, request, response):
+        if CovidService.version is not None:
+            response['X-Data-Version'] = CovidService.version
+        return response
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """
+    Times the requests, the views add their stages to request.timings. The durations are sent
+    in the Server-Timing header and recorded for /metrics/ under the name of the view.
+    """
+
+    def process_request(self, request):
+        request.timings = metrics.Timings()
+
+    def process_response(self, request, response):
+        timings = getattr(request, 'timings', None)
+        match = getattr(request, 'resolver_match', None)
+        if timings is None or match is None:
+            return response
+
+        total = timings.elapsed()
+        metrics.record(metrics.view_name(match.func), timings, total)
+        response['Server-Timing'] = timings.header(total)
+        return response
@@ -0,0 +1,68 @@
+# Generated by Django 3.1.14 on 2026-10-18 14:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Case',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_evento_caso', models.IntegerField(db_index=True)),
+                ('sexo', models.CharField(max_length=2, null=True)),
+                ('edad', models.FloatField(null=True)),
+                ('edad_años_meses', models.CharField(max_length=5, null=True)),
+                ('residencia_pais_nombre', models.TextField(null=True)),
+                ('residencia_provincia_nombre', models.TextField(null=True)),
+                ('residencia_departamento_nombre', models.TextField(null=True)),
+                ('carga_provincia_nombre', models.CharField(max_length=32, null=True)),
+                ('fecha_inicio_sintomas', models.DateField(null=True)),
+                ('fecha_apertura', models.DateField(null=True)),
+                ('sepi_apertura', models.SmallIntegerField(null=True)),
+                ('fecha_internacion', models.DateField(null=True)),
+                ('cuidado_intensivo', models.BooleanField(default=False)),
+                ('fecha_cui_intensivo', models.DateField(null=True)),
+                ('fallecido', models.BooleanField(default=False)),
+                ('fecha_fallecimiento', models.DateField(null=True)),
+                ('asistencia_respiratoria_mecanica', models.BooleanField(default=False)),
+                ('carga_provincia_id', models.SmallIntegerField(null=True)),
+                ('origen_financiamiento', models.CharField(max_length=8, null=True)),
+                ('clasificacion', models.TextField(null=True)),
+                ('clasificacion_resumen', models.CharField(max_length=16, null=True)),
+                ('residencia_provincia_id', models.SmallIntegerField(null=True)),
+                ('fecha_diagnostico', models.DateField(null=True)),
+                ('residencia_departamento_id', models.SmallIntegerField(null=True)),
+                ('ultima_actualizacion', models.DateField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CaseVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=64)),
+                ('last_update', models.CharField(max_length=10)),
+                ('cases', models.IntegerField()),
+                ('columns', models.TextField()),
+                ('loaded', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['carga_provincia_nombre', 'fecha_diagnostico', 'clasificacion_resumen', 'fallecido'], name='case_province_diagnosis'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['carga_provincia_nombre', 'fecha_fallecimiento', 'clasificacion_resumen'], name='case_province_death'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['clasificacion_resumen', 'fallecido', 'cuidado_intensivo', 'asistencia_respiratoria_mecanica', 'fecha_diagnostico', 'fecha_fallecimiento', 'carga_provincia_nombre'], name='case_flags'),
+        ),
+    ]
@@ -50,3 +50,69 @@ class Classification:
         return data_classification
 
 
+class Case(models.Model):
+    """
+    A case of Covid19Casos.csv. The cases are only stored in the database with COVID_QUERY_BACKEND=sql,
+    see services/sql.py. The fields have the names of the columns of the file.
+    """
+
+    id_evento_caso = models.IntegerField(db_index=True)
+    sexo = models.CharField(max_length=2, null=True)
+    edad = models.FloatField(null=True)
+    edad_años_meses = models.CharField(max_length=5, null=True)
+    residencia_pais_nombre = models.TextField(null=True)
+    residencia_provincia_nombre = models.TextField(null=True)
+    residencia_departamento_nombre = models.TextField(null=True)
+    carga_provincia_nombre = models.CharField(max_length=32, null=True)
+    fecha_inicio_sintomas = models.DateField(null=True)
+    fecha_apertura = models.DateField(null=True)
+    sepi_apertura = models.SmallIntegerField(null=True)
+    fecha_internacion = models.DateField(null=True)
+    cuidado_intensivo = models.BooleanField(default=False)
+    fecha_cui_intensivo = models.DateField(null=True)
+    fallecido = models.BooleanField(default=False)
+    fecha_fallecimiento = models.DateField(null=True)
+    asistencia_respiratoria_mecanica = models.BooleanField(default=False)
+    carga_provincia_id = models.SmallIntegerField(null=True)
+    origen_financiamiento = models.CharField(max_length=8, null=True)
+    clasificacion = models.TextField(null=True)
+    clasificacion_resumen = models.CharField(max_length=16, null=True)
+    residencia_provincia_id = models.SmallIntegerField(null=True)
+    fecha_diagnostico = models.DateField(null=True)
+    residencia_departamento_id = models.SmallIntegerField(null=True)
+    ultima_actualizacion = models.DateField(null=True)
+
+    class Meta:
+        indexes = [
+            # The summaries count the cases and deaths of each day, of a province or of every province.
+            # The columns of the filters are included so the counts are read from the indexes
+            models.Index(
+                fields=['carga_provincia_nombre', 'fecha_diagnostico', 'clasificacion_resumen', 'fallecido'],
+                name='case_province_diagnosis'
+            ),
+            models.Index(
+                fields=['carga_provincia_nombre', 'fecha_fallecimiento', 'clasificacion_resumen'],
+                name='case_province_death'
+            ),
+            # The counts with the filters of the flags, and the summaries and stats of the country
+            models.Index(
+                fields=[
+                    'clasificacion_resumen', 'fallecido', 'cuidado_intensivo', 'asistencia_respiratoria_mecanica',
+                    'fecha_diagnostico', 'fecha_fallecimiento', 'carga_provincia_nombre',
+                ],
+                name='case_flags'
+            ),
+        ]
+
+
+class CaseVersion(models.Model):
+    """
+    Version of the snapshot the cases of the database were loaded from, the last one is served
+    """
+
+    version = models.CharField(max_length=64)
+    last_update = models.CharField(max_length=10)
+    cases = models.IntegerField()
+    # Columns of the snapshot, separated by commas. The others are null
+    columns = models.TextField()
+    loaded = models.DateTimeField(auto_now_add=True)
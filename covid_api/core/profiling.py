@@ -0,0 +1,185 @@
+import cProfile
+import json
+import os
+import pstats
+import random
+import shutil
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+from functools import wraps
+
+from django.core.exceptions import SynchronousOnlyOperation
+
+from covid_api.core.metrics import view_name
+from covid_api.core.services import CovidService
+from covid_api.settings import BASE_DIR, PROFILE_DIR, PROFILE_MAX_DUMPS, PROFILE_SAMPLE_RATE
+
+STATS_FILE_NAME = 'stats.prof'
+ALLOCATIONS_FILE_NAME = 'allocations.tracemalloc'
+META_FILE_NAME = 'meta.json'
+
+# Query parameter of the requests that staff users ask to profile
+PROFILE_PARAM = 'profile'
+
+# Frames kept for each allocation, enough to reach the code of the API from pandas and numpy
+TRACEBACK_FRAMES = 25
+
+# One request is profiled at a time in the process, the profilers and tracemalloc would see the others
+_lock = threading.Lock()
+
+
+def _pop_profile(request):
+    """
+    Removes the profile parameter from the query of the request, so the request is routed and cached
+    as the same request without it. Returns whether it asked for a profile.
+    """
+    if PROFILE_PARAM not in request.GET:
+        return False
+    query = request.GET.copy()
+    requested = query.pop(PROFILE_PARAM)[-1].lower() == 'true'
+    request.GET = query
+    request.META['QUERY_STRING'] = query.urlencode()
+    return requested
+
+
+def _sampled(request, requested):
+    if requested:
+        try:
+            user = getattr(request, 'user', None)
+            return user is not None and user.is_staff
+        except SynchronousOnlyOperation:
+            # The cheap views answered on the event loop can not read the session
+            return False
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def profiled(view):
+    """
+    Decorates a view to profile a sample of its requests, PROFILE_SAMPLE_RATE of them.
+    Staff users can profile a request adding profile=true to the query.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _sampled(request, _pop_profile(request)) or not _lock.acquire(blocking=False):
+            return view(request, *args, **kwargs)
+        try:
+            return _profile(view, request, *args, **kwargs)
+        finally:
+            _lock.release()
+
+    return wrapper
+
+
+def _profile(view, request, *args, **kwargs):
+    profiler = cProfile.Profile()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start(TRACEBACK_FRAMES)
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        response = view(request, *args, **kwargs)
+        # Rendered here so the serialisation is profiled too
+        if hasattr(response, 'render'):
+            response.render()
+    finally:
+        profiler.disable()
+        duration = time.perf_counter() - start
+        allocations = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+
+    dump(profiler, allocations, {
+        'view': view_name(view),
+        'path': request.path,
+        'query': {param: values for param, values in request.GET.lists()},
+        'version': CovidService.version,
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 3),
+        'peak_memory_bytes': peak,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'pid': os.getpid(),
+    })
+    return response
+
+
+def dump(profiler, allocations, meta, directory=PROFILE_DIR, max_dumps=PROFILE_MAX_DUMPS):
+    """
+    Writes the stats of the profiler, the allocations and their meta data to a new directory of dumps.
+    Only the newest max_dumps are kept.
+    """
+    name = '{}-{}-{}'.format(datetime.now().strftime('%Y%m%d%H%M%S%f'), os.getpid(), meta['view'])
+    tmp_path = os.path.join(directory, f'{name}.tmp')
+    os.makedirs(tmp_path)
+    profiler.dump_stats(os.path.join(tmp_path, STATS_FILE_NAME))
+    allocations.dump(os.path.join(tmp_path, ALLOCATIONS_FILE_NAME))
+    with open(os.path.join(tmp_path, META_FILE_NAME), 'w', encoding='utf-8') as meta_file:
+        json.dump(meta, meta_file, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(directory, name))
+
+    for old in list_dumps(directory)[:-max_dumps]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def list_dumps(directory=PROFILE_DIR):
+    """
+    Returns the paths of the dumps, the oldest first
+    """
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if not name.endswith('.tmp'))
+    return [os.path.join(directory, name) for name in names]
+
+
+def read_meta(path):
+    with open(os.path.join(path, META_FILE_NAME), encoding='utf-8') as meta_file:
+        return json.load(meta_file)
+
+
+def top_functions(paths, sort, top):
+    """
+    Returns the calls, own time and cumulative time of the top functions of the dumps, summed over them
+    """
+    stats = pstats.Stats(*[os.path.join(path, STATS_FILE_NAME) for path in paths])
+    stats.sort_stats(sort)
+    rows = []
+    for function in stats.fcn_list[:top]:
+        _, calls, own_time, cumulative_time, _ = stats.stats[function]
+        filename, lineno, name = function
+        rows.append((calls, own_time, cumulative_time, f'{filename}:{lineno}({name})'))
+    return rows
+
+
+def _is_api(filename):
+    # The virtual environment may be in the directory of the API
+    return filename.startswith(BASE_DIR) and filename != __file__ and 'site-packages' not in filename
+
+
+def _allocator(traceback):
+    # The innermost frame in the code of the API, pandas and numpy allocate for it
+    for frame in reversed(traceback):
+        if _is_api(frame.filename):
+            return f'{frame.filename}:{frame.lineno}'
+    frame = traceback[-1]
+    return f'{frame.filename}:{frame.lineno}'
+
+
+def top_allocators(paths, top):
+    """
+    Returns the locations holding the most memory at the end of the requests of the dumps,
+    with the bytes and blocks they held summed over the dumps
+    """
+    sizes = defaultdict(lambda: [0, 0])
+    for path in paths:
+        allocations = tracemalloc.Snapshot.load(os.path.join(path, ALLOCATIONS_FILE_NAME))
+        allocations = allocations.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        for statistic in allocations.statistics('traceback'):
+            size = sizes[_allocator(statistic.traceback)]
+            size[0] += statistic.size
+            size[1] += statistic.count
+    return sorted(((location, size, count) for location, (size, count) in sizes.items()), key=lambda row: -row[1])[:top]
@@ -0,0 +1,13 @@
+"""
+Entry point of the processes of the query pool, see services/pool.py.
+It must not import covid_api.core.services at module level: importing the services imports the models,
+which needs the apps set up first.
+"""
+
+
+def initialize():
+    import django
+    django.setup()
+
+    from covid_api.core.services import pool
+    pool.attach(None)
@@ -0,0 +1,72 @@
+import json
+
+import pandas as pd
+from rest_framework.renderers import JSONRenderer
+from rest_framework_csv.renderers import CSVRenderer
+
+# Decimal places of the floats, as written by DataFrame.to_json
+DOUBLE_PRECISION = 10
+
+
+def frame_to_json(data_frame):
+    """
+    Returns the rows of the data frame as a JSON array, with its index as the index field
+    """
+    content = data_frame.reset_index().to_json(orient='records', force_ascii=False, double_precision=DOUBLE_PRECISION)
+    # Same escaping as JSONRenderer
+    return content.replace('\\/', '/').replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+
+
+def frame_to_csv(data_frame, header=True):
+    """
+    Returns the rows of the data frame as CSV with the columns sorted by name, as CSVRenderer writes them
+    """
+    if data_frame.empty:
+        return ''
+    data_frame = data_frame.reset_index()
+    for column in data_frame.columns:
+        if pd.api.types.is_float_dtype(data_frame[column]):
+            data_frame[column] = data_frame[column].astype('float64').round(DOUBLE_PRECISION)
+    return data_frame[sorted(data_frame.columns)].to_csv(index=False, header=header, line_terminator='\r\n')
+
+
+def _is_frames(data):
+    # Data frames keyed by name
+    return isinstance(data, dict) and data and all(isinstance(value, pd.DataFrame) for value in data.values())
+
+
+class DataFrameJSONRenderer(JSONRenderer):
+    """
+    Writes the data frames, or a dict of them, straight from their columns.
+    Any other data is rendered by JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, pd.DataFrame):
+            content = frame_to_json(data)
+        elif _is_frames(data):
+            content = '{' + ','.join(
+                f'{json.dumps(key, ensure_ascii=False)}:{frame_to_json(frame)}' for key, frame in data.items()
+            ) + '}'
+        else:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(json.loads(content), accepted_media_type, renderer_context)
+        return content.encode('utf-8')
+
+
+class DataFrameCSVRenderer(CSVRenderer):
+    """
+    Writes the data frames straight from their columns, a dict of them as one table with
+    the key in the column given by the key_column of the renderer context.
+    Any other data is rendered by CSVRenderer.
+    """
+
+    def render(self, data, media_type=None, renderer_context=None, writer_opts=None):
+        if _is_frames(data):
+            key_column = (renderer_context or {}).get('key_column', 'key')
+            data = pd.concat([frame.assign(**{key_column: key}) for key, frame in data.items()])
+        if not isinstance(data, pd.DataFrame):
+            return super().render(data, media_type, renderer_context, writer_opts)
+        return frame_to_csv(data).encode('utf-8')
@@ -1,36 +1,215 @@
 import json
 import os
-from datetime import datetime, timedelta
-import xlrd
+import threading
+import time
+import numpy as np
 import pandas as pd
+from django.db import connections
+from covid_api.core import metrics
 from covid_api.core.models import Province
-from covid_api.settings import COVID_FILE_NAME
+from covid_api.core.services import cube, download, ingest, pool, population, schema, snapshot, sql
+from covid_api.core.services.dataset import Dataset
+from covid_api.settings import COVID_FILE_NAME, COVID_SNAPSHOT_DIR, COVID_DATA_LOADING, COVID_DATA_URL, \
+    COVID_SNAPSHOT_COLUMNS, COVID_INGEST_MEMORY_MB, COVID_INGEST_MODE, COVID_QUERY_BACKEND
 
 
 class DataFrameWrapper:
-    data_frame = None
+    """
+    Wraps a data frame and records the filters applied to it. The filters are evaluated
+    together, using the indexes of the data frame if it has them, and the rows are only
+    copied when the data frame is needed.
+    """
+
+    # Column with the amount of cases of each row, None if each row is a case
+    weights = None
+
+    # Frame of the dataset the source is, 'cases' or 'cube', None for any other data frame
+    origin = None
+
+    def __init__(self, data_frame, weights=None, predicates=None, indexes=None, origin=None):
+        self._source = data_frame
+        self._predicates = list(predicates or [])
+        self._indexes = indexes
+        self._selection = None
+        self._data_frame = None
+        self.weights = weights
+        self.origin = origin
+
+    @property
+    def data_frame(self):
+        if self._data_frame is None:
+            if self._filtered():
+                self._data_frame = self._source.iloc[self.selection()]
+            else:
+                self._data_frame = self._source
+        return self._data_frame
+
+    @data_frame.setter
+    def data_frame(self, data_frame):
+        self._source = data_frame
+        self._predicates = []
+        self._indexes = None
+        self._selection = None
+        self._data_frame = None
+        self.origin = None
+
+    def _filter(self, operator, column, value):
+        self._predicates.append((operator, column, value))
+        self._selection = None
+        self._data_frame = None
+        return self
 
-    def __init__(self, data_frame):
-        self.data_frame = data_frame
+    def _filtered(self):
+        return bool(self._predicates) or self._selection is not None
+
+    def source_rows(self):
+        # Rows the filters run on
+        return len(self._source.index)
+
+    def query(self):
+        """
+        Returns the frame of the dataset and the filters that give these rows, None if they
+        can not be selected again from the dataset
+        """
+        if self.origin is None:
+            return None
+        return self.origin, list(self._predicates)
+
+    def selection(self):
+        """
+        Returns the rows that pass all the filters, as sorted row ids if an index
+        could be used, otherwise as a boolean mask
+        """
+        if self._selection is None:
+            rows = None
+            if self._indexes is not None:
+                rows = self._indexes.select(self._source, self._predicates, _evaluate)
+
+            if rows is None:
+                rows = np.ones(len(self._source.index), dtype=bool)
+                for operator, column, value in self._predicates:
+                    rows &= _evaluate(self._source[column], operator, value)
+            self._selection = rows
+        return self._selection
 
     def count(self):
         # Count rows
-        return len(self.data_frame.index)
+        if not self._filtered():
+            if self.weights:
+                return int(self._source[self.weights].sum())
+            return len(self._source.index)
+        rows = self.selection()
+        if self.weights:
+            return int(self._source[self.weights].values[rows].sum())
+        return int(rows.sum()) if rows.dtype == bool else len(rows)
+
+    def count_by(self, columns):
+        # Count rows for each value of the columns
+        projection = list(columns) + ([self.weights] if self.weights else [])
+        data_frame = self._source[projection]
+        if self._filtered():
+            data_frame = data_frame.iloc[self.selection()]
+        groups = data_frame.groupby(columns, observed=True)
+        if self.weights:
+            return groups[self.weights].sum()
+        return groups.size()
+
+    def crosstab(self, column, flag):
+        """
+        Returns the amount of rows for each category of column and value of the boolean flag,
+        counted in a single pass. The last row counts the rows without a category.
+        """
+        rows = self.positions()
+        categories = self._source[column].cat.categories
+        keys = self._source[column].cat.codes.values[rows].astype(np.int64)
+        keys[keys < 0] = len(categories)
+        keys = keys * 2 + self._source[flag].values[rows]
+
+        weights = self._source[self.weights].values[rows] if self.weights else None
+        counts = np.bincount(keys, weights, minlength=2 * (len(categories) + 1))
+        return pd.DataFrame(
+            counts.reshape(-1, 2).astype(np.int64),
+            index=list(categories) + [None],
+            columns=[False, True]
+        )
+
+    def count_days(self, column, dates, by=None):
+        """
+        Returns the amount of rows for each of the dates of the date column, counted by binning
+        the day numbers. With by, one row of counts for each category of that column.
+        """
+        rows = self.positions()
+        values = self._source[column].values[rows]
+        days = len(dates)
+        keys = values.astype('M8[D]').astype(np.int64) - (schema.day_number(dates[0]) if days else 0)
+        keep = ~np.isnat(values) & (keys >= 0) & (keys < days)
+
+        groups = 1
+        if by is not None:
+            codes = self._source[by].cat.codes.values[rows]
+            groups = len(self._source[by].cat.categories)
+            keep &= codes >= 0
+            keys = keys + codes.astype(np.int64) * days
+
+        weights = None
+        if self.weights:
+            weights = self._source[self.weights].values[rows][keep]
+        counts = np.bincount(keys[keep], weights, minlength=groups * days).astype(np.int64)
+        return counts.reshape(groups, days) if by is not None else counts
+
+    def positions(self):
+        """
+        Returns the ids of the rows that pass all the filters, in the order they are returned
+        """
+        if not self._filtered():
+            return np.arange(len(self._source.index))
+        rows = self.selection()
+        return np.flatnonzero(rows) if rows.dtype == bool else rows
+
+    def page(self, column, after=None, limit=None):
+        """
+        Keeps the rows with column greater than after, sorted by column, at most limit of them
+        """
+        if after is not None:
+            self.filter_gt(column, after)
+        rows = self.positions()
+        values = self._source[column].values[rows]
+        if limit is not None and limit < len(rows):
+            # Only the first rows of the page are sorted
+            first = np.argpartition(values, limit - 1)[:limit]
+            rows, values = rows[first], values[first]
+        self._selection = rows[np.argsort(values, kind='stable')]
+        self._data_frame = None
+        # The page is not described by the filters
+        self.origin = None
+        return self
+
+    def chunks(self, size):
+        """
+        Yields the rows that pass the filters, with the values of Covid19Casos.csv,
+        in data frames of at most size rows numbered from the first row
+        """
+        rows = self.positions()
+        for start in range(0, len(rows), size):
+            chunk = self._source.iloc[rows[start:start + size]].reset_index(drop=True)
+            chunk.index += start
+            yield schema.to_external(chunk)
 
     def copy(self):
-        return DataFrameWrapper(self.data_frame.copy())
+        # The source is never modified, copying the filters is enough
+        return DataFrameWrapper(self._source, self.weights, self._predicates, self._indexes, self.origin)
 
     def filter_eq(self, column, value):
-        self.data_frame = self.data_frame.loc[self.data_frame[column] == value]
-        return self
+        return self._filter('eq', column, value)
 
     def filter_ge(self, column, value):
-        self.data_frame = self.data_frame.loc[self.data_frame[column] >= value]
-        return self
+        return self._filter('ge', column, value)
 
     def filter_le(self, column, value):
-        self.data_frame = self.data_frame.loc[self.data_frame[column] <= value]
-        return self
+        return self._filter('le', column, value)
+
+    def filter_gt(self, column, value):
+        return self._filter('gt', column, value)
 
     def group_by(self, columns):
         self.data_frame = self.data_frame.groupby(columns)
@@ -44,145 +223,351 @@ class DataFrameWrapper:
         self.data_frame = self.data_frame.describe()
         return self
 
+    def to_frame(self):
+        """
+        Returns the rows with the values of Covid19Casos.csv, numbered from 0
+        """
+        return schema.to_external(self.data_frame.reset_index(drop=True))
+
     def to_json(self, orient="table"):
-        df = self.data_frame.reset_index(drop=True)
-        json_string = df.to_json(orient=orient)
+        json_string = self.to_frame().to_json(orient=orient)
         return json.loads(json_string)['data']
 
     def __getitem__(self, column):
         return self.data_frame[column]
 
 
+def _evaluate(series, operator, value):
+    """
+    Returns the boolean array of the comparison, working on the codes and raw values of the column
+    """
+    if pd.api.types.is_categorical_dtype(series):
+        categories = series.cat.categories
+        if operator != 'eq':
+            return _evaluate(series.astype(categories.dtype), operator, value)
+        if value not in categories:
+            return np.zeros(len(series.index), dtype=bool)
+        return series.cat.codes.values == categories.get_loc(value)
+
+    values = series.values
+    if pd.api.types.is_bool_dtype(series) and operator == 'eq':
+        return values if value else ~values
+    if pd.api.types.is_datetime64_dtype(series):
+        value = pd.Timestamp(value).to_datetime64()
+
+    if operator == 'eq':
+        return values == value
+    if operator == 'ge':
+        return values >= value
+    if operator == 'gt':
+        return values > value
+    return values <= value
+
+
 class CovidService:
 
-    _raw_data = None
+    # Version of the snapshot served, see services/dataset.py, or the cases of the database, see services/sql.py
+    _dataset = None
+
+    # Only one load of the data runs at a time in the process
+    _load_lock = threading.Lock()
+
+    # Marker of the manifest the dataset was loaded from, see snapshot.manifest_stat
+    _manifest_stat = None
 
-    data_url = 'https://sisa.msal.gov.ar/datos/descargas/covid-19/files/Covid19Casos.csv'
+    data_url = COVID_DATA_URL
 
-    # Refresh time in hours
-    refresh_rate = 1
+    # Version of the snapshot currently loaded, the hash of its content
+    version = None
 
-    last_refresh = None
+    @classmethod
+    def dataset(cls) -> Dataset:
+        """
+        Returns the dataset being served. Once the first one is loaded, each request checks if
+        a new manifest was published, the new version is loaded by a background thread and the
+        requests keep using the current one until it is replaced.
+        """
+        if cls._dataset is None:
+            with cls._load_lock:
+                if cls._dataset is None:
+                    cls._load()
+        elif cls._has_changed() and cls._load_lock.acquire(blocking=False):
+            threading.Thread(target=cls._refresh, name='covid-data-refresh', daemon=True).start()
+        return cls._dataset
 
     @classmethod
-    def get_data(cls) -> DataFrameWrapper:
-        is_time_to_refresh = True
+    def is_loaded(cls):
+        return cls._dataset is not None
 
-        if cls.last_refresh:
-            refresh_time = cls.last_refresh + timedelta(hours=cls.refresh_rate)
-            is_time_to_refresh = refresh_time < datetime.now()
+    @classmethod
+    def start_loading(cls):
+        """
+        Loads the first dataset in a background thread, unless it is loaded or being loaded
+        """
+        if cls._dataset is None and cls._load_lock.acquire(blocking=False):
+            threading.Thread(target=cls._refresh, name='covid-data-load', daemon=True).start()
 
-        if cls._raw_data is None or is_time_to_refresh:
-            if not os.path.isfile(COVID_FILE_NAME):
-                # Update the data from the url and save the file
-                cls.update_data()
+    @classmethod
+    def _after_fork(cls):
+        # A load running in the parent when it forked does not run in the child, nothing would release
+        # its lock. The manifest it was loading is checked again on the next request
+        if cls._load_lock.locked():
+            cls._load_lock = threading.Lock()
+            cls._manifest_stat = None
 
-            cls._raw_data = pd.read_csv(
-                COVID_FILE_NAME,
-                encoding='utf-8'
-            )
-            # Get the base hour
-            cls.last_refresh = datetime.now().replace(
-                minute=0,
-                second=0,
-                microsecond=0
-            )
-        return DataFrameWrapper(cls._raw_data)
+    @classmethod
+    def _has_changed(cls):
+        # A stat of the manifest, cheap enough for every request
+        stat = snapshot.manifest_stat(COVID_SNAPSHOT_DIR)
+        return stat is not None and stat != cls._manifest_stat
 
     @classmethod
-    def update_data(cls):
-        data_frame = pd.read_csv(
-            cls.data_url,
-            encoding='utf-8'
-        )
-        data_frame.to_csv(COVID_FILE_NAME, index=False)
-        cls._raw_data = None
+    def _refresh(cls):
+        try:
+            cls._load()
+        except sql.CasesNotLoaded:
+            # Checked again by the next request
+            pass
+        finally:
+            cls._load_lock.release()
+            # The connections of this thread would be left open
+            connections.close_all()
 
-    def population_per_province(cls):
-        provinces_population = {}
-        workbook = xlrd.open_workbook('poblacion.xls')
-
-        for worksheet in workbook.sheets():
-            split_name = worksheet.name.split('-')
-            if len(split_name) < 2:
-                continue
-            province_slug = split_name[0]
-            province_name = Province.from_slug(province_slug)
-            if province_name:
-                provinces_population[province_slug] = worksheet.cell(16, 1).value
-                continue
+    @classmethod
+    def _load(cls):
+        # Taken before reading, a manifest published meanwhile is loaded on the next request.
+        # It is only recorded once the load succeeded, a failed load is retried on the next request
+        stat = snapshot.manifest_stat(COVID_SNAPSHOT_DIR)
+        manifest = snapshot.read_manifest(COVID_SNAPSHOT_DIR)
+        if manifest is None:
+            if os.path.isfile(COVID_FILE_NAME):
+                # Build the snapshot from the file downloaded by an older version
+                cls.build_snapshot()
             else:
-                country_population = worksheet.cell(15, 1).value
+                # Update the data from the url and save the file
+                cls.update_data()
+            stat = snapshot.manifest_stat(COVID_SNAPSHOT_DIR)
+            manifest = snapshot.read_manifest(COVID_SNAPSHOT_DIR)
+
+        if COVID_QUERY_BACKEND == 'sql':
+            cls._load_table(manifest, stat)
+            return
+
+        # A snapshot with the same content, as a rebuild of the same file, is not loaded again
+        if cls._dataset is None or cls._dataset.version != snapshot.manifest_version(manifest):
+            start = time.perf_counter()
+            dataset = Dataset.load(COVID_SNAPSHOT_DIR, manifest, memory_map=COVID_DATA_LOADING == 'mmap')
+            metrics.dataset_reload.observe(time.perf_counter() - start)
+            # The new dataset is built aside, the requests see either the previous one or this one
+            cls._dataset = dataset
+            cls.version = dataset.version
+        cls._manifest_stat = stat
 
-        provinces_population['ARG'] = country_population
+    @classmethod
+    def _load_table(cls, manifest, stat):
+        # The update loads the snapshots into the database, the requests get a 503 until it loaded one
+        table = sql.Table.current()
+        if table is None:
+            raise sql.CasesNotLoaded()
+        cls._dataset = table
+        cls.version = table.version
+        # While the ingest is still loading the new snapshot, it is checked again on the next request
+        cls._manifest_stat = stat if table.version == snapshot.manifest_version(manifest) else None
 
-        return provinces_population
+    @classmethod
+    def get_data(cls):
+        if COVID_QUERY_BACKEND == 'sql':
+            return cls.dataset().cases()
+        return dataset_data(cls.dataset(), 'cases')
 
     @classmethod
-    def population_summary_metrics(cls, dfw, slug):
+    def get_aggregated_data(cls, query_params=()) -> DataFrameWrapper:
+        """
+        Returns the cube of counts if it can answer the query, otherwise the cases.
+        Only use it to count cases.
+        """
+        dataset = cls.dataset()
+        if COVID_QUERY_BACKEND == 'sql':
+            # The indexes of the table answer the counts
+            return dataset.cases()
+        if dataset.cube is not None and cube.can_answer(query_params):
+            return dataset_data(dataset, 'cube')
+        return dataset_data(dataset, 'cases')
 
-        if slug:
-            population = cls.population_per_province(cls)[slug]
+    @classmethod
+    def province_stats(cls):
+        """
+        Returns the confirmed cases and deaths of each province and of the country, as 'Argentina'
+        """
+        data = cls.get_aggregated_data()
+        if pool.accepts(data.query()):
+            stats = pool.run(pool.province_stats, cls.dataset().version, data.query())
+            if stats is not None:
+                return stats
+        return province_stats(data)
+
+    @classmethod
+    def last_update(cls):
+        return cls.dataset().last_update()
+
+    @classmethod
+    def build_snapshot(cls):
+        """
+        Builds a new snapshot from the downloaded file and returns the ingest statistics
+        """
+        if COVID_INGEST_MODE == 'incremental':
+            ingest_file = ingest.ingest_incremental
         else:
-            population = cls.population_per_province(cls)['ARG']
+            ingest_file = ingest.ingest
 
-        HUNDRED_THOUSAND = 100000
-        MILLION = 1000000
-        df = dfw.data_frame
+        stats = ingest_file(
+            COVID_FILE_NAME,
+            COVID_SNAPSHOT_DIR,
+            columns=COVID_SNAPSHOT_COLUMNS,
+            memory_limit_mb=COVID_INGEST_MEMORY_MB
+        )
+        population.compile_registry()
+        if COVID_QUERY_BACKEND == 'sql':
+            sql.load(COVID_SNAPSHOT_DIR, snapshot.read_manifest(COVID_SNAPSHOT_DIR))
+        return stats
 
-        # per hundred thousand
-        df['casos_cada_cien_mil'] = round(df['casos'] * HUNDRED_THOUSAND/population)
-        df['muertes_cada_cien_mil'] = round(df['muertes'] * HUNDRED_THOUSAND/population)
-        df['casos_acum_cada_cien_mil'] = round(df['casos_acum'] * HUNDRED_THOUSAND/population)
-        df['muertes_acum_cada_cien_mil'] = round(df['muertes_acum'] * HUNDRED_THOUSAND/population)
+    @classmethod
+    def update_data(cls):
+        """
+        Downloads the file if it changed and ingests it.
+        Returns the ingest statistics or None if there was nothing to ingest.
+        """
+        is_new_file = download.download(cls.data_url, COVID_FILE_NAME)
+
+        if is_new_file or snapshot.read_manifest(COVID_SNAPSHOT_DIR) is None:
+            return cls.build_snapshot()
+        if COVID_QUERY_BACKEND == 'sql':
+            # The database may hold an older snapshot, as when the backend was changed
+            sql.load(COVID_SNAPSHOT_DIR, snapshot.read_manifest(COVID_SNAPSHOT_DIR))
+        return None
 
-        # per million
-        df['casos_por_millón'] = round(df['casos'] * MILLION / population)
-        df['muertes_por_millón'] = round(df['muertes'] * MILLION  / population)
-        df['casos_acum_por_millón'] = round(df['casos_acum'] * MILLION  / population)
-        df['muertes_acum_por_millón'] = round(df['muertes_acum'] * MILLION  / population)
+    @classmethod
+    def population_per_province(cls):
+        return population.registry()
 
-        return DataFrameWrapper(df)
+    @classmethod
+    def population_summary_metrics(cls, dfw, slug):
+        """
+        Adds the counts of the summary per hundred thousand and per million inhabitants
+        """
+        population = cls.population_per_province()[slug or 'ARG']
 
+        df = dfw.data_frame
+        counts = df[['casos', 'muertes', 'casos_acum', 'muertes_acum']]
+        df = pd.concat([
+            df,
+            (counts * 100000 / population).round().add_suffix('_cada_cien_mil'),
+            (counts * 1000000 / population).round().add_suffix('_por_millón'),
+        ], axis=1)
+
+        return DataFrameWrapper(df)
 
     @classmethod
     def summary(cls, group_by_vector, start_date, end_date, data):
+        """
+        Returns the cases and deaths of each day from start_date to end_date and their cumulative sums.
+        The data is expected to hold a single group of group_by_vector, the counts are its totals.
+        """
+        dates = cls._summary_dates(start_date, end_date)
+        query = data.query()
+        if pool.accepts(query):
+            summary = pool.run(pool.summary, cls.dataset().version, query, dates)
+            if summary is not None:
+                return DataFrameWrapper(summary)
+        return DataFrameWrapper(summary_frame(data, dates))
+
+    @classmethod
+    def province_summaries(cls, start_date, end_date, data):
+        """
+        Returns the summary of each province with its population metrics, keyed by slug.
+        The days of every province are counted in a single pass, or by province in the query pool.
+        """
+        dates = cls._summary_dates(start_date, end_date)
+        query = data.query()
+        if pool.accepts(query):
+            slugs = list(Province.PROVINCES)
+            summaries = pool.fan_out(pool.province_summaries, slugs, cls.dataset().version, query, dates)
+            if summaries is not None:
+                return summaries
+        return province_summaries(data, dates, list(Province.PROVINCES))
 
+    @classmethod
+    def _summary_dates(cls, start_date, end_date):
         start_date = start_date if start_date else '2020-02-11'
 
         if not end_date:
-            end_date = CovidService.get_data()['ultima_actualizacion'].max()
+            end_date = cls.dataset().last_update()
 
-        summary = data.data_frame
+        return pd.date_range(start=start_date, end=end_date)
 
-        raw_range = pd.date_range(start=start_date, end=end_date)
-        range_strings = raw_range.format(formatter=lambda x: x.strftime('%Y-%m-%d'))
-        df = pd.DataFrame(range_strings, columns=['fecha_diagnostico'])
 
-        cases_count = summary.groupby(
-            [elem for elem in group_by_vector] + ['fecha_diagnostico'],
-            as_index=False
-        ).count()
-        df2 = cases_count[['fecha_diagnostico']].copy()
-        df2['casos'] = cases_count['id_evento_caso']
+os.register_at_fork(after_in_child=CovidService._after_fork)
 
-        summary = summary.loc[summary['fallecido'] == 'SI']
-        deaths_count = summary.groupby(
-            [elem for elem in group_by_vector] + ['fecha_fallecimiento'],
-            as_index=False
-        ).count()[['fecha_fallecimiento', 'id_evento_caso']]
-        deaths_count = deaths_count.rename(
-            columns={'id_evento_caso': "muertes", 'fecha_fallecimiento': "fecha_diagnostico"})
 
-        df = df.merge(df2, on='fecha_diagnostico', how='left')
-        df = df.merge(deaths_count, on='fecha_diagnostico', how='left')
+def dataset_data(dataset, origin, predicates=None):
+    """
+    Returns the cases or the cube of counts of the dataset, see DataFrameWrapper.query
+    """
+    if origin == 'cube':
+        return DataFrameWrapper(dataset.cube, weights=cube.COUNT, predicates=predicates, origin=origin)
+    return DataFrameWrapper(dataset.data_frame, predicates=predicates, indexes=dataset.indexes, origin=origin)
 
-        df = df.fillna(value=0)
 
-        df['muertes_acum'] = df['muertes'].cumsum()
-        df['casos_acum'] = df['casos'].cumsum()
+def province_stats(data):
+    data = data.filter_eq('clasificacion_resumen', 'Confirmado')
+    counts = data.crosstab('carga_provincia_nombre', 'fallecido')
+    stats = pd.DataFrame({'casos': counts.sum(axis=1), 'muertes': counts[True]})
+    country = stats.sum()
+    stats = stats.iloc[:-1]
+    stats.loc['Argentina'] = country
+    return stats
 
-        df = df.rename(
-            columns={'fecha_diagnostico': "fecha"})
 
-        return DataFrameWrapper(df)
+def summary_frame(data, dates):
+    cases = data.count_days('fecha_diagnostico', dates)
+    deaths = data.copy().filter_eq('fallecido', True).count_days('fecha_fallecimiento', dates)
+
+    df = pd.DataFrame({
+        'fecha': dates.strftime(schema.DATE_FORMAT),
+        'casos': _counts(cases),
+        'muertes': _counts(deaths),
+    })
+    df['muertes_acum'] = df['muertes'].cumsum()
+    df['casos_acum'] = df['casos'].cumsum()
+    return df
+
+
+def province_summaries(data, dates, slugs):
+    cases = data.count_days('fecha_diagnostico', dates, by='carga_provincia_nombre')
+    deaths = data.copy().filter_eq('fallecido', True).count_days(
+        'fecha_fallecimiento', dates, by='carga_provincia_nombre'
+    )
+
+    fechas = dates.strftime(schema.DATE_FORMAT)
+    populations = population.registry()
+    provinces = schema.CATEGORIES['carga_provincia_nombre']
+
+    summaries = {}
+    for slug in slugs:
+        position = provinces.index(Province.PROVINCES[slug])
+        counts = {'casos': _counts(cases[position]), 'muertes': _counts(deaths[position])}
+        counts['muertes_acum'] = counts['muertes'].cumsum()
+        counts['casos_acum'] = counts['casos'].cumsum()
+
+        # Same columns as population_summary_metrics, without building a frame for each step
+        columns = {'fecha': fechas, **counts}
+        for suffix, factor in (('_cada_cien_mil', 100000), ('_por_millón', 1000000)):
+            for name in ('casos', 'muertes', 'casos_acum', 'muertes_acum'):
+                columns[name + suffix] = np.round(counts[name] * factor / populations[slug])
+        summaries[slug] = pd.DataFrame(columns)
+    return summaries
+
+
+def _counts(counts):
+    # Days without rows used to be missing from the groups and filled with 0.0, so the counts are floats then
+    return counts.astype(np.float64) if (counts == 0).any() else counts
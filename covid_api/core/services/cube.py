@@ -0,0 +1,81 @@
+import pandas as pd
+
+from covid_api.core.services import schema
+
+# Columns the filters of the API work on, the cube counts the cases for each combination
+DIMENSIONS = [
+    'carga_provincia_nombre',
+    'clasificacion_resumen',
+    'cuidado_intensivo',
+    'asistencia_respiratoria_mecanica',
+    'fallecido',
+    'fecha_diagnostico',
+    'fecha_fallecimiento',
+]
+
+COUNT = 'cantidad'
+
+# Query parameters that can be answered from the cube
+PARAMETERS = {'classification', 'icu', 'respirator', 'dead', 'from', 'to', 'format'}
+
+
+def can_answer(query_params):
+    return set(query_params).issubset(PARAMETERS)
+
+
+def _keys(data_frame):
+    # The groupby drops NaN keys, so the dimensions are grouped by their integer codes
+    keys = {}
+    for column in DIMENSIONS:
+        values = data_frame[column]
+        if pd.api.types.is_categorical_dtype(values):
+            keys[column] = values.cat.codes.values
+        elif pd.api.types.is_datetime64_dtype(values):
+            keys[column] = values.values.view('i8')
+        else:
+            keys[column] = values.values
+    return pd.DataFrame(keys)
+
+
+def _typed(keys):
+    cube = pd.DataFrame()
+    for column in DIMENSIONS:
+        if column in schema.CATEGORIES:
+            cube[column] = pd.Categorical.from_codes(keys[column].values, categories=schema.CATEGORIES[column])
+        elif column in schema.DATES:
+            cube[column] = keys[column].values.view('M8[ns]')
+        else:
+            cube[column] = keys[column].values
+    cube[COUNT] = keys[COUNT].values
+    return cube
+
+
+def _sum(keys):
+    keys = keys.groupby(DIMENSIONS, sort=False)[COUNT].sum().reset_index()
+    return keys.loc[keys[COUNT] != 0].reset_index(drop=True)
+
+
+def build(data_frame):
+    """
+    Returns the amount of cases for each combination of the dimensions
+    """
+    keys = _keys(data_frame)
+    keys[COUNT] = 1
+    return _typed(_sum(keys))
+
+
+def add(*cubes):
+    keys = []
+    for cube in cubes:
+        if cube is None:
+            continue
+        cube_keys = _keys(cube)
+        cube_keys[COUNT] = cube[COUNT].values
+        keys.append(cube_keys)
+    return _typed(_sum(pd.concat(keys, ignore_index=True)))
+
+
+def subtract(cube, other):
+    other = other.copy()
+    other[COUNT] = -other[COUNT]
+    return add(cube, other)
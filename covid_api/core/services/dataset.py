@@ -0,0 +1,43 @@
+from covid_api.core.services import schema, snapshot
+from covid_api.core.services.indexes import Indexes
+
+
+class Dataset:
+    """
+    A version of the snapshot as the API serves it: the cases, their indexes and the cube of counts.
+    A dataset is not modified once loaded, a newer version is loaded into a new dataset.
+    """
+
+    def __init__(self, manifest, data_frame, indexes, cube):
+        self.manifest = manifest
+        self.data_frame = data_frame
+        self.indexes = indexes
+        self.cube = cube
+
+    @property
+    def version(self):
+        return snapshot.manifest_version(self.manifest)
+
+    @classmethod
+    def load(cls, directory, manifest, memory_map=False, columns=None):
+        data_frame = schema.normalise(snapshot.load(directory, manifest, memory_map=memory_map, columns=columns))
+        # The indexes written by the ingest are shared by the processes that memory map them
+        table = snapshot.read_indexes(directory, manifest, memory_map)
+        indexes = Indexes.from_table(table) if table is not None else Indexes(data_frame)
+        return cls(manifest, data_frame, indexes, snapshot.read_cube(directory, manifest))
+
+    def __len__(self):
+        return len(self.data_frame.index)
+
+    def last_update(self):
+        return last_update(self.manifest, self.data_frame)
+
+
+def last_update(manifest, data_frame):
+    """
+    Returns the last update of the snapshot, from the cases if its manifest does not have it
+    """
+    value = manifest.get('last_update')
+    if value is None:
+        value = data_frame['ultima_actualizacion'].max().strftime(schema.DATE_FORMAT)
+    return value
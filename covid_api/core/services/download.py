@@ -0,0 +1,108 @@
+import http.client
+import json
+import os
+import urllib.error
+import urllib.request
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _read_meta(path):
+    try:
+        with open(path, encoding='utf-8') as meta_file:
+            return json.load(meta_file)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_meta(path, meta):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as meta_file:
+        json.dump(meta, meta_file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _validators(response):
+    return {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+
+
+def _fetch(url, path, meta_path, timeout):
+    """
+    Makes one request for url. Returns False if upstream has not changed,
+    raises if the transfer is interrupted leaving the partial file to be resumed.
+    """
+    part_path = f'{path}.part'
+    meta = _read_meta(meta_path)
+    headers = {}
+
+    if os.path.isfile(path):
+        # Conditional request against the file already published
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    offset = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+    partial = meta.get('partial', {})
+    validator = partial.get('etag') or partial.get('last_modified')
+    if offset and validator:
+        # Resume the interrupted download only if upstream is still the same file
+        headers['Range'] = f'bytes={offset}-'
+        headers['If-Range'] = validator
+
+    try:
+        response = urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout)
+    except urllib.error.HTTPError as error:
+        if error.code == 304:
+            if os.path.isfile(part_path):
+                os.remove(part_path)
+            return False
+        if error.code == 416:
+            # The partial file is not valid anymore
+            os.remove(part_path)
+        raise
+
+    with response:
+        if response.status == 206 and response.headers.get('Content-Range', '').startswith(f'bytes {offset}-'):
+            mode = 'ab'
+        else:
+            mode = 'wb'
+            offset = 0
+            meta['partial'] = _validators(response)
+            _write_meta(meta_path, meta)
+
+        length = response.headers.get('Content-Length')
+        expected = offset + int(length) if length is not None else None
+
+        with open(part_path, mode) as part_file:
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                part_file.write(chunk)
+
+    if expected is not None and os.path.getsize(part_path) != expected:
+        raise ConnectionError(f'Download of {url} interrupted at {os.path.getsize(part_path)} of {expected} bytes')
+
+    # Publish the complete file, readers see either the old or the new one
+    os.replace(part_path, path)
+    _write_meta(meta_path, meta['partial'])
+    return True
+
+
+def download(url, path, retries=3, timeout=60):
+    """
+    Downloads url into path using a conditional request.
+    Returns True if a new file was published, False if upstream has not changed.
+    """
+    meta_path = f'{path}.meta.json'
+    for attempt in range(retries):
+        try:
+            return _fetch(url, path, meta_path, timeout)
+        except (OSError, http.client.HTTPException) as error:
+            # Retry interrupted transfers, the next attempt resumes from the partial file
+            if attempt == retries - 1 or (isinstance(error, urllib.error.HTTPError) and error.code != 416):
+                raise
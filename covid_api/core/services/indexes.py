@@ -0,0 +1,179 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from covid_api.core.services import schema
+
+# Columns filtered by value, the index keeps the rows of each value
+VALUE_COLUMNS = [
+    'carga_provincia_nombre',
+    'clasificacion_resumen',
+    'fallecido',
+    'cuidado_intensivo',
+    'asistencia_respiratoria_mecanica',
+]
+
+# Columns filtered by range, the index keeps the rows sorted by date
+DATE_COLUMNS = [
+    'fecha_diagnostico',
+    'fecha_fallecimiento',
+]
+
+# Values in more rows than this fraction are not indexed, scanning is as fast as using the index
+MAX_SELECTIVITY = 0.5
+
+
+def _array(table, name):
+    # A single chunk is read without a copy, from the pages of the memory mapped file
+    chunks = table.column(name).chunks
+    if len(chunks) == 1:
+        return chunks[0].to_numpy()
+    return np.concatenate([chunk.to_numpy() for chunk in chunks] or [np.empty(0, dtype=np.int32)])
+
+
+class Indexes:
+    """
+    Secondary indexes of the case table: the row ids of each value of VALUE_COLUMNS
+    and the rows of DATE_COLUMNS sorted by date
+    """
+
+    def __init__(self, data_frame):
+        self.rows = len(data_frame.index)
+        self._sorted = {}
+        self._values = {}
+        self._dates = {}
+
+        for column in VALUE_COLUMNS:
+            if column in data_frame:
+                self._set_values(column, *self._sort_values(data_frame[column]))
+
+        for column in DATE_COLUMNS:
+            if column in data_frame:
+                self._dates[column] = self._index_dates(data_frame[column])
+
+    @staticmethod
+    def _sort_values(series):
+        if pd.api.types.is_categorical_dtype(series):
+            keys = series.cat.codes.values.astype(np.int16)
+            labels = list(series.cat.categories)
+        else:
+            keys = series.values.astype(np.int16)
+            labels = [False, True]
+
+        # A stable sort keeps the row ids of each value sorted
+        order = np.argsort(keys, kind='stable').astype(np.int32)
+        bounds = np.searchsorted(keys[order], np.arange(len(labels) + 1))
+        return labels, order, bounds
+
+    def _set_values(self, column, labels, order, bounds):
+        # The rows of each value are a slice of the sorted rows, no copy is made
+        self._sorted[column] = labels, order, bounds
+        index = {}
+        for code, label in enumerate(labels):
+            rows = order[bounds[code]:bounds[code + 1]]
+            index[label] = rows if len(rows) <= MAX_SELECTIVITY * self.rows else None
+        self._values[column] = index
+
+    def _index_dates(self, series):
+        dates = series.values
+        rows = np.flatnonzero(~np.isnat(dates))
+        days = dates[rows].astype('M8[D]').astype(np.int32)
+        order = np.argsort(days, kind='stable')
+        return days[order], rows[order].astype(np.int32)
+
+    def to_table(self):
+        """
+        Returns the indexes as an Arrow table with a column of row ids for each index,
+        which the processes loading it from a memory mapped file share
+        """
+        arrays, names, layout = [], [], {}
+        for column, (labels, order, bounds) in self._sorted.items():
+            arrays.append(order)
+            names.append(column)
+            layout[column] = {'labels': labels, 'bounds': bounds.tolist()}
+        for column, (days, rows) in self._dates.items():
+            # The columns have a value for each row, the rows without a date are left out at the end
+            padding = np.zeros(self.rows - len(rows), dtype=np.int32)
+            arrays += [np.concatenate([days, padding]), np.concatenate([rows, padding])]
+            names += [f'{column}.days', f'{column}.rows']
+            layout[column] = {'dates': len(rows)}
+        table = pa.Table.from_arrays([pa.array(array) for array in arrays], names=names)
+        return table.replace_schema_metadata({'indexes': json.dumps({'rows': self.rows, 'columns': layout})})
+
+    @classmethod
+    def from_table(cls, table):
+        """
+        Returns the indexes of a table written by to_table, the row ids point into its arrays
+        """
+        layout = json.loads(table.schema.metadata[b'indexes'])
+        indexes = cls.__new__(cls)
+        indexes.rows = layout['rows']
+        indexes._sorted = {}
+        indexes._values = {}
+        indexes._dates = {}
+        for column, entry in layout['columns'].items():
+            if 'dates' in entry:
+                days = _array(table, f'{column}.days')[:entry['dates']]
+                rows = _array(table, f'{column}.rows')[:entry['dates']]
+                indexes._dates[column] = days, rows
+            else:
+                order = _array(table, column)
+                indexes._set_values(column, entry['labels'], order, np.array(entry['bounds']))
+        return indexes
+
+    def _value_rows(self, column, value):
+        index = self._values[column]
+        if value not in index:
+            return np.empty(0, dtype=np.int32)
+        return index[value]
+
+    def _date_rows(self, column, start, end):
+        days, rows = self._dates[column]
+        first = np.searchsorted(days, schema.day_number(start), side='left') if start is not None else 0
+        last = np.searchsorted(days, schema.day_number(end), side='right') if end is not None else len(days)
+        return rows[first:last]
+
+    def _candidates(self, predicates):
+        """
+        Yields the rows each index selects and the predicates they cover
+        """
+        ranges = {}
+        for predicate in predicates:
+            operator, column, value = predicate
+            if operator == 'eq' and column in self._values:
+                rows = self._value_rows(column, value)
+                if rows is not None:
+                    yield rows, [predicate]
+            elif operator in ('ge', 'le') and column in self._dates:
+                ranges.setdefault(column, []).append(predicate)
+
+        # The bounds on the same date column are a single range of the sorted rows
+        for column, column_predicates in ranges.items():
+            start = max((value for operator, _, value in column_predicates if operator == 'ge'),
+                        key=schema.day_number, default=None)
+            end = min((value for operator, _, value in column_predicates if operator == 'le'),
+                      key=schema.day_number, default=None)
+            yield self._date_rows(column, start, end), column_predicates
+
+    def select(self, data_frame, predicates, evaluate):
+        """
+        Returns the sorted ids of the rows that pass the predicates, or None if no index applies.
+        The most selective index gives the candidate rows, the rest of the predicates are
+        evaluated only on them, so the cost depends on the size of the selection.
+        """
+        best = None
+        for rows, covered in self._candidates(predicates):
+            if best is None or len(rows) < len(best[0]):
+                best = rows, covered
+        if best is None:
+            return None
+
+        rows, covered = best
+        rows = np.sort(rows)
+        for operator, column, value in predicates:
+            if (operator, column, value) in covered or not len(rows):
+                continue
+            rows = rows[evaluate(data_frame[column].iloc[rows], operator, value)]
+        return rows
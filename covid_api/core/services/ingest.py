@@ -0,0 +1,217 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+from covid_api.core.services import cube, indexes, schema, snapshot
+
+# Rows of the first chunk, the next ones are sized to fit in the memory limit
+FIRST_CHUNK_ROWS = 50000
+
+# Copies of a chunk alive at the same time: parsed, normalised and converted to Arrow
+CHUNK_COPIES = 3
+
+# An incremental ingest rebuilds the snapshot when the changed rows are more than this fraction of the rows
+MAX_DELTA_RATIO = 0.2
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+
+
+def _chunks(csv_path, columns, memory_limit_mb):
+    """
+    Yields the normalised chunks of the csv, keeping only the given columns (plus the ones the API queries)
+    """
+    keep = set(columns or schema.COLUMNS) | set(schema.QUERY_COLUMNS)
+    memory_limit = memory_limit_mb * 2 ** 20
+
+    reader = pd.read_csv(
+        csv_path,
+        encoding='utf-8',
+        usecols=lambda column: column in keep,
+        dtype=schema.CSV_DTYPES,
+        iterator=True
+    )
+    chunk_rows = FIRST_CHUNK_ROWS
+    is_first_chunk = True
+
+    while True:
+        try:
+            chunk = reader.get_chunk(chunk_rows)
+        except StopIteration:
+            break
+
+        if is_first_chunk:
+            # Size the next chunks with the memory used by the rows of the first one
+            row_bytes = chunk.memory_usage(index=False, deep=True).sum() / max(len(chunk.index), 1)
+            chunk_rows = max(1000, int(memory_limit / (row_bytes * CHUNK_COPIES)))
+            is_first_chunk = False
+
+        yield schema.normalise(chunk)
+
+    reader.close()
+
+
+def row_hashes(chunk):
+    return pd.util.hash_pandas_object(chunk, index=False).values
+
+
+def _last_update(chunk, last_update=None):
+    chunk_last_update = chunk['ultima_actualizacion'].max()
+    if pd.isnull(chunk_last_update):
+        return last_update
+    chunk_last_update = chunk_last_update.strftime(schema.DATE_FORMAT)
+    return max(last_update, chunk_last_update) if last_update else chunk_last_update
+
+
+def _stats(start, rows, **kwargs):
+    seconds = time.perf_counter() - start
+    return dict(
+        rows=rows,
+        seconds=seconds,
+        rows_per_second=rows / seconds,
+        peak_rss_mb=peak_rss_mb(),
+        **kwargs
+    )
+
+
+def _write_indexes(directory, writer):
+    """
+    Closes the writer and writes the indexes of its file, read back so the rows are numbered as the API loads them.
+    Returns the file name.
+    """
+    writer.close()
+    columns = [column for column in indexes.VALUE_COLUMNS + indexes.DATE_COLUMNS if column in writer.columns]
+    data_frame = schema.normalise(snapshot.read_file(directory, writer.file_name, columns))
+    return snapshot.write_indexes(directory, writer.version, indexes.Indexes(data_frame).to_table())
+
+
+def ingest(csv_path, directory, columns=None, memory_limit_mb=512):
+    """
+    Parses the csv in chunks and appends each normalised chunk to a new snapshot.
+    Returns the statistics of the ingest.
+    """
+    start = time.perf_counter()
+    writer = snapshot.SnapshotWriter(directory)
+    ids, hashes = [], []
+    counts = None
+    last_update = None
+
+    for chunk in _chunks(csv_path, columns, memory_limit_mb):
+        writer.write(chunk)
+        ids.append(chunk['id_evento_caso'].values)
+        hashes.append(row_hashes(chunk))
+        counts = cube.add(counts, cube.build(chunk))
+        last_update = _last_update(chunk, last_update)
+
+    ids, hashes = np.concatenate(ids), np.concatenate(hashes)
+    manifest = writer.publish(
+        indexes=_write_indexes(directory, writer),
+        hashes=snapshot.write_hashes(directory, writer.version, ids, hashes),
+        content_hash=snapshot.content_hash(ids, hashes),
+        cube=snapshot.write_cube(directory, writer.version, counts),
+        last_update=last_update
+    )
+
+    return _stats(
+        start,
+        writer.rows,
+        mode='full',
+        version=snapshot.manifest_version(manifest),
+        inserted=writer.rows,
+        updated=0
+    )
+
+
+def ingest_incremental(csv_path, directory, columns=None, memory_limit_mb=512):
+    """
+    Compares the csv with the current snapshot by id_evento_caso and publishes a new base with
+    the inserted and updated rows folded into the rows of the snapshot, patching its cube.
+    Falls back to a full ingest when there is no snapshot to compare with, rows were deleted
+    or too many rows changed. Returns the statistics of the ingest.
+    """
+    manifest = snapshot.read_manifest(directory)
+    current = snapshot.read_hashes(directory, manifest) if manifest else None
+    current_counts = snapshot.read_cube(directory, manifest) if manifest else None
+
+    if current is None or current_counts is None or len(current[0]) == 0:
+        return ingest(csv_path, directory, columns, memory_limit_mb)
+
+    start = time.perf_counter()
+    current_ids, current_hashes = current
+    seen = np.zeros(len(current_ids), dtype=bool)
+    writer = snapshot.SnapshotWriter(directory, kind='delta')
+    ids, hashes = [], []
+    added_counts = None
+    last_update = manifest.get('last_update')
+    rows = inserted = 0
+
+    for chunk in _chunks(csv_path, columns, memory_limit_mb):
+        if list(chunk.columns) != manifest['columns']:
+            # The columns changed, the delta can not be applied to the snapshot
+            writer.discard()
+            return ingest(csv_path, directory, columns, memory_limit_mb)
+
+        chunk_ids = chunk['id_evento_caso'].values
+        chunk_hashes = row_hashes(chunk)
+        position = np.minimum(np.searchsorted(current_ids, chunk_ids), len(current_ids) - 1)
+        found = current_ids[position] == chunk_ids
+        seen[position[found]] = True
+
+        changed = ~found | (current_hashes[position] != chunk_hashes)
+        if changed.any():
+            changed_rows = chunk.loc[changed]
+            writer.write(changed_rows)
+            added_counts = cube.add(added_counts, cube.build(changed_rows))
+            last_update = _last_update(changed_rows, last_update)
+        inserted += int((~found).sum())
+        rows += len(chunk.index)
+        ids.append(chunk_ids)
+        hashes.append(chunk_hashes)
+
+    too_large = writer.rows > MAX_DELTA_RATIO * rows
+    if not seen.all() or too_large:
+        # Deleted rows can not be expressed as a delta, and large deltas cost as much as the full ingest
+        writer.discard()
+        return ingest(csv_path, directory, columns, memory_limit_mb)
+
+    if writer.rows == 0:
+        writer.discard()
+        version = snapshot.manifest_version(manifest)
+        return _stats(start, rows, mode='incremental', version=version, inserted=0, updated=0)
+
+    ids, hashes = np.concatenate(ids), np.concatenate(hashes)
+    writer.close()
+    base = snapshot.SnapshotWriter(directory)
+    replaced = base.write_folded(manifest, writer)
+    # Patch the cube: remove the previous version of the updated rows and add the changed rows
+    counts = cube.add(current_counts, added_counts)
+    if len(replaced.index):
+        counts = cube.subtract(counts, cube.build(replaced))
+    del replaced
+    manifest = base.publish(
+        indexes=_write_indexes(directory, base),
+        hashes=snapshot.write_hashes(directory, base.version, ids, hashes),
+        content_hash=snapshot.content_hash(ids, hashes),
+        cube=snapshot.write_cube(directory, base.version, counts),
+        last_update=last_update
+    )
+
+    return _stats(
+        start,
+        rows,
+        mode='incremental',
+        version=snapshot.manifest_version(manifest),
+        inserted=inserted,
+        updated=writer.rows - inserted
+    )
@@ -0,0 +1,162 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from covid_api.core import query_worker
+from covid_api.core.models import Province
+from covid_api.core.services import schema, snapshot
+from covid_api.settings import COVID_QUERY_WORKERS, COVID_QUERY_TIMEOUT, COVID_SNAPSHOT_DIR
+
+# Worker processes that run the aggregations, 0 runs them in the thread of the request
+_workers = COVID_QUERY_WORKERS
+_executor = None
+
+# Dataset of a worker process, with only the columns the queries read. It is memory mapped from the snapshot
+# with the indexes written by the ingest, the workers share those pages instead of each holding a copy.
+# The flags, the dates with missing values and the text columns are still converted into each worker
+_dataset = None
+
+
+class QueryTimeout(Exception):
+    """
+    The query did not end in the time it was given, the views answer it with a 503
+    """
+
+
+def enabled():
+    return _workers > 0
+
+
+def accepts(query):
+    """
+    Returns if the query is run in the workers. Only the queries of the cases are, the cube answers
+    faster than a worker is reached: those with query parameters it can not answer or on a snapshot without one.
+    """
+    return enabled() and query is not None and query[0] == 'cases'
+
+
+def configure(workers):
+    """
+    Sets the amount of worker processes, the current ones are stopped
+    """
+    global _workers, _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    _workers = workers
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # Spawned, a fork would copy the threads and the data of the server
+        _executor = ProcessPoolExecutor(
+            max_workers=_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=query_worker.initialize
+        )
+    return _executor
+
+
+def _reset():
+    # A worker died, the next query starts a new pool
+    global _executor
+    _executor.shutdown(wait=False)
+    _executor = None
+
+
+def _wait(futures, timeout):
+    deadline = time.monotonic() + timeout
+    try:
+        return [future.result(timeout=max(0, deadline - time.monotonic())) for future in futures]
+    except TimeoutError:
+        # A query already running keeps its worker until it ends, the queued ones are dropped
+        for future in futures:
+            future.cancel()
+        raise QueryTimeout()
+    except BrokenProcessPool:
+        _reset()
+        raise
+
+
+def run(task, version, *args, timeout=None):
+    """
+    Runs the task on the data version in a worker process and returns its result, raises QueryTimeout
+    if it does not end in timeout seconds. Returns None if the worker answered from another version,
+    a snapshot published before the server loaded it, the query is then run in the request.
+    """
+    future = _get_executor().submit(task, version, *args)
+    used, result = _wait([future], timeout or COVID_QUERY_TIMEOUT)[0]
+    return result if used == version else None
+
+
+def fan_out(task, slugs, version, *args, timeout=None):
+    """
+    Splits the province slugs among the workers, each runs the task on the data version for its share.
+    Returns the results of the tasks merged in the order of slugs, None as run does.
+    """
+    executor = _get_executor()
+    futures = [
+        executor.submit(task, slugs[worker::_workers], version, *args)
+        for worker in range(min(_workers, len(slugs)))
+    ]
+    results = {}
+    for used, result in _wait(futures, timeout or COVID_QUERY_TIMEOUT):
+        if used != version:
+            return None
+        results.update(result)
+    return {slug: results[slug] for slug in slugs}
+
+
+# --- WORKER PROCESSES --- #
+
+def attach(version):
+    """
+    Returns the dataset of the worker, reloaded if the server has seen another version.
+    Only the published snapshot can be loaded, its version may differ from the one of the server.
+    """
+    global _dataset
+    if _dataset is None or _dataset.version != version:
+        from covid_api.core.services.dataset import Dataset
+
+        manifest = snapshot.read_manifest(COVID_SNAPSHOT_DIR)
+        if _dataset is None or _dataset.version != snapshot.manifest_version(manifest):
+            columns = [column for column in schema.QUERY_COLUMNS if column in manifest['columns']]
+            _dataset = Dataset.load(COVID_SNAPSHOT_DIR, manifest, memory_map=True, columns=columns)
+    return _dataset
+
+
+def _data(version, query):
+    # The version of the dataset is returned with the result of each task
+    from covid_api.core.services.covid_service import dataset_data
+
+    origin, predicates = query
+    dataset = attach(version)
+    return dataset.version, dataset_data(dataset, origin, predicates)
+
+
+def summary(version, query, dates):
+    from covid_api.core.services.covid_service import summary_frame
+
+    used, data = _data(version, query)
+    return used, summary_frame(data, dates)
+
+
+def province_summaries(slugs, version, query, dates):
+    from covid_api.core.services.covid_service import province_summaries
+
+    used, data = _data(version, query)
+    summaries = {}
+    for slug in slugs:
+        # Only the rows of the province are counted
+        province = data.copy().filter_eq('carga_provincia_nombre', Province.PROVINCES[slug])
+        summaries.update(province_summaries(province, dates, [slug]))
+    return used, summaries
+
+
+def province_stats(version, query):
+    from covid_api.core.services.covid_service import province_stats
+
+    used, data = _data(version, query)
+    return used, province_stats(data)
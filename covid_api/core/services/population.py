@@ -0,0 +1,69 @@
+import json
+import os
+
+from covid_api.core.models import Province
+from covid_api.settings import POPULATION_FILE_NAME, COVID_SNAPSHOT_DIR
+
+# Population of each province slug and of the country, compiled from POPULATION_FILE_NAME into COVID_SNAPSHOT_DIR
+REGISTRY_FILE_NAME = 'population.json'
+
+COUNTRY = 'ARG'
+
+_registry = None
+
+
+def _parse(path):
+    # xlrd is only needed when the registry is compiled
+    import xlrd
+
+    registry = {}
+    workbook = xlrd.open_workbook(path)
+    for worksheet in workbook.sheets():
+        split_name = worksheet.name.split('-')
+        if len(split_name) < 2:
+            continue
+        province_slug = split_name[0]
+        if Province.from_slug(province_slug):
+            registry[province_slug] = int(worksheet.cell(16, 1).value)
+        else:
+            # The sheet of the country comes first and has one row less
+            registry[COUNTRY] = int(worksheet.cell(15, 1).value)
+    return registry
+
+
+def _registry_path():
+    # Read when used, not when imported, so it follows the directory of the snapshot
+    return os.path.join(COVID_SNAPSHOT_DIR, REGISTRY_FILE_NAME)
+
+
+def compile_registry(path=POPULATION_FILE_NAME, registry_path=None):
+    """
+    Parses the workbook into registry_path, unless it is already newer than the workbook
+    """
+    registry_path = registry_path or _registry_path()
+    if os.path.isfile(registry_path) and os.path.getmtime(registry_path) >= os.path.getmtime(path):
+        return
+    registry = _parse(path)
+    os.makedirs(os.path.dirname(registry_path), exist_ok=True)
+    tmp_path = f'{registry_path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as registry_file:
+        json.dump(registry, registry_file, indent=2)
+    os.replace(tmp_path, registry_path)
+
+
+def registry():
+    """
+    Returns the population of each province slug and of the country as 'ARG',
+    the country first and then the provinces in the order of the workbook
+    """
+    global _registry
+    if _registry is None:
+        registry_path = _registry_path()
+        compile_registry(registry_path=registry_path)
+        with open(registry_path, encoding='utf-8') as registry_file:
+            _registry = json.load(registry_file)
+    return _registry
+
+
+def get(slug):
+    return registry()[slug]
@@ -0,0 +1,144 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from covid_api.core.models import Province, Classification
+
+logger = logging.getLogger(__name__)
+
+# Low cardinality columns, the categories are fixed so every snapshot shares them
+CATEGORIES = {
+    'sexo': ['F', 'M', 'NR'],
+    'edad_años_meses': ['Años', 'Meses'],
+    'carga_provincia_nombre': list(Province.PROVINCES.values()),
+    'origen_financiamiento': ['Público', 'Privado'],
+    'clasificacion_resumen': list(Classification.classifications.values()),
+}
+
+# SI/NO columns stored as booleans
+FLAGS = [
+    'cuidado_intensivo',
+    'fallecido',
+    'asistencia_respiratoria_mecanica',
+]
+
+DATES = [
+    'fecha_inicio_sintomas',
+    'fecha_apertura',
+    'fecha_internacion',
+    'fecha_cui_intensivo',
+    'fecha_fallecimiento',
+    'fecha_diagnostico',
+    'ultima_actualizacion',
+]
+
+# The nullable types (Int8, Int16) keep the cases without a value missing
+NUMBERS = {
+    'id_evento_caso': 'int32',
+    'edad': 'float32',
+    'sepi_apertura': 'Int8',
+    'carga_provincia_id': 'Int8',
+    'residencia_provincia_id': 'Int8',
+    'residencia_departamento_id': 'Int16',
+}
+
+# Free text columns, kept as strings
+STRINGS = [
+    'residencia_pais_nombre',
+    'residencia_provincia_nombre',
+    'residencia_departamento_nombre',
+    'clasificacion',
+]
+
+# Columns used by the filters and aggregations of the API
+QUERY_COLUMNS = [
+    'id_evento_caso',
+    'carga_provincia_nombre',
+    'cuidado_intensivo',
+    'fecha_fallecimiento',
+    'fallecido',
+    'asistencia_respiratoria_mecanica',
+    'clasificacion_resumen',
+    'fecha_diagnostico',
+    'ultima_actualizacion',
+]
+
+COLUMNS = list(CATEGORIES) + FLAGS + DATES + list(NUMBERS) + STRINGS
+
+# Types used to parse Covid19Casos.csv, everything but the numbers is read as text
+CSV_DTYPES = {column: str for column in COLUMNS if column not in NUMBERS}
+
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def normalise(data_frame):
+    """
+    Converts the columns read from Covid19Casos.csv to the compact types of the schema.
+    Columns that already have their type are left untouched.
+    """
+    for column, categories in CATEGORIES.items():
+        if column in data_frame and not pd.api.types.is_categorical_dtype(data_frame[column]):
+            values = pd.Categorical(data_frame[column], categories=categories)
+            unknown = values.isna() & data_frame[column].notna().values
+            if unknown.any():
+                # A new value upstream would silently drop out of every count
+                new_values = pd.unique(data_frame[column].values[unknown])
+                logger.warning(
+                    '%d values of %s outside its categories are read as missing: %s',
+                    unknown.sum(), column, ', '.join(map(repr, new_values[:10]))
+                )
+            data_frame[column] = values
+
+    for column in FLAGS:
+        if column in data_frame and not pd.api.types.is_bool_dtype(data_frame[column]):
+            data_frame[column] = data_frame[column] == 'SI'
+
+    for column in DATES:
+        if column in data_frame and not pd.api.types.is_datetime64_dtype(data_frame[column]):
+            data_frame[column] = pd.to_datetime(data_frame[column], format=DATE_FORMAT, errors='coerce')
+
+    for column, dtype in NUMBERS.items():
+        if column in data_frame and data_frame[column].dtype != dtype:
+            values = pd.to_numeric(data_frame[column], errors='coerce')
+            if dtype.startswith('int'):
+                # Every case has an id
+                values = values.fillna(0)
+            data_frame[column] = values.astype(dtype)
+
+    return data_frame
+
+
+def day_number(value):
+    """
+    Returns the days from 1970-01-01 to the date, as the dates of the data frames are binned and indexed
+    """
+    return int(pd.Timestamp(value).to_datetime64().astype('M8[D]').astype(np.int64))
+
+
+def to_external(data_frame):
+    """
+    Returns a copy of the data frame with the values as they appear in Covid19Casos.csv
+    """
+    data_frame = data_frame.copy()
+
+    for column in FLAGS:
+        if column in data_frame and pd.api.types.is_bool_dtype(data_frame[column]):
+            data_frame[column] = data_frame[column].map({True: 'SI', False: 'NO'})
+
+    for column in DATES:
+        if column in data_frame and pd.api.types.is_datetime64_dtype(data_frame[column]):
+            data_frame[column] = data_frame[column].dt.strftime(DATE_FORMAT)
+
+    return data_frame
+
+
+def memory_report(data_frame):
+    """
+    Returns the bytes used by each column of the data frame
+    """
+    usage = data_frame.memory_usage(index=False, deep=True)
+    return pd.DataFrame({
+        'dtype': data_frame.dtypes.astype(str),
+        'bytes': usage,
+    })
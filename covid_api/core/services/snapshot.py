@@ -0,0 +1,296 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pyarrow as pa
+
+MANIFEST_FILE_NAME = 'manifest.json'
+
+
+def manifest_path(directory):
+    return os.path.join(directory, MANIFEST_FILE_NAME)
+
+
+def manifest_stat(directory):
+    """
+    Returns a marker that changes every time a manifest is published, None if there is none
+    """
+    try:
+        stat = os.stat(manifest_path(directory))
+    except FileNotFoundError:
+        return None
+    # The manifest is replaced on publish, so its inode changes even within the mtime resolution
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def manifest_version(manifest):
+    # Snapshots published before the content hash use the version of their files
+    return manifest.get('content_hash', manifest['version'])
+
+
+def read_manifest(directory):
+    """
+    Returns the manifest of the published snapshot or None if there is none
+    """
+    try:
+        with open(manifest_path(directory), encoding='utf-8') as manifest_file:
+            return json.load(manifest_file)
+    except FileNotFoundError:
+        return None
+
+
+def _replace(path, write):
+    # Write next to the destination and rename so readers never see a partial file
+    tmp_path = f'{path}.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_manifest(directory, manifest):
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+    _replace(manifest_path(directory), write)
+
+
+def _file_names(manifest):
+    return {manifest['file'], manifest.get('hashes'), manifest.get('cube'), manifest.get('indexes')}
+
+
+def _publish_manifest(directory, manifest):
+    previous = read_manifest(directory)
+    _write_manifest(directory, manifest)
+
+    # Keep the files of the previous manifest around, a worker may still be opening them
+    keep = _file_names(manifest) | (_file_names(previous) if previous else set())
+    for name in os.listdir(directory):
+        if name.endswith('.arrow') and name not in keep:
+            os.remove(os.path.join(directory, name))
+
+
+class SnapshotWriter:
+    """
+    Writes a snapshot file in batches, the file is published when all the batches are written
+    """
+
+    def __init__(self, directory, kind='base'):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        self.file_name = f'{self.version}.{kind}.arrow'
+        self.rows = 0
+        self._path = os.path.join(directory, self.file_name)
+        self._sink = None
+        self._writer = None
+        self._schema = None
+        self._closed = False
+
+    def _open(self, table):
+        # Columns without values in the first batch are typed as strings
+        fields = [
+            pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+            for field in table.schema
+        ]
+        metadata = dict(table.schema.metadata or {})
+        metadata[b'version'] = self.version.encode()
+        self._schema = pa.schema(fields, metadata=metadata)
+        self._sink = pa.OSFile(f'{self._path}.tmp', 'wb')
+        self._writer = pa.ipc.new_file(self._sink, self._schema)
+
+    def write(self, data_frame):
+        table = pa.Table.from_pandas(data_frame, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            self._open(table)
+            table = pa.Table.from_pandas(data_frame, schema=self._schema, preserve_index=False)
+        self._writer.write_table(table)
+        self.rows += len(data_frame.index)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._writer.close()
+        self._sink.close()
+        _compact(f'{self._path}.tmp')
+        # Rename so readers never see a partial file
+        os.replace(f'{self._path}.tmp', self._path)
+
+    def discard(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            os.remove(f'{self._path}.tmp')
+
+    @property
+    def columns(self):
+        return self._schema.names
+
+    def publish(self, **extra):
+        """
+        Publishes the file as the base of the current snapshot and returns its manifest.
+        The extra values (files derived from the snapshot, last update) are added to the manifest.
+        """
+        self.close()
+        manifest = dict(
+            version=self.version,
+            created=datetime.now().isoformat(),
+            file=self.file_name,
+            base_version=self.version,
+            columns=self.columns,
+            rows=self.rows,
+            **extra
+        )
+        _publish_manifest(self.directory, manifest)
+        return manifest
+
+    def write_folded(self, manifest, delta):
+        """
+        Writes the rows of the snapshot of the manifest, with the rows of the closed delta file in place
+        of the ones with their id_evento_caso. The delta file is removed.
+        Published as the new base, the workers load a single file they can memory map instead of applying
+        the delta to a private copy of the whole snapshot. Holds the rows that are kept in memory once.
+        Returns the rows of the snapshot that were replaced.
+        """
+        current = load(self.directory, manifest, memory_map=True)
+        changed = read_file(self.directory, delta.file_name)
+        replaced = current['id_evento_caso'].isin(changed['id_evento_caso']).values
+        self.write(current.loc[~replaced])
+        self.write(changed)
+        replaced = current.loc[replaced].copy()
+        del current, changed
+        os.remove(os.path.join(self.directory, delta.file_name))
+        return replaced
+
+
+def _compact(path):
+    """
+    Rewrites the batches of the file as a single one, so each column is one contiguous array.
+    Only the columns of a single chunk can point into a memory mapped file, to_pandas concatenates
+    the others into the private memory of each process. Holds the columns of the file in memory once.
+    """
+    source = pa.memory_map(path, 'r')
+    reader = pa.ipc.open_file(source)
+    if reader.num_record_batches > 1:
+        table = reader.read_all().combine_chunks()
+        with pa.OSFile(f'{path}.compact', 'wb') as sink:
+            writer = pa.ipc.new_file(sink, table.schema)
+            writer.write_table(table)
+            writer.close()
+        del table
+        os.replace(f'{path}.compact', path)
+    del reader
+    source.close()
+
+
+def _write_table(directory, file_name, table):
+    def write(tmp_path):
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            writer = pa.ipc.new_file(sink, table.schema)
+            writer.write_table(table)
+            writer.close()
+    _replace(os.path.join(directory, file_name), write)
+    return file_name
+
+
+def write_hashes(directory, version, ids, hashes):
+    """
+    Writes the hash of each row sorted by id, used to find the rows that changed.
+    Returns the file name.
+    """
+    order = np.argsort(ids, kind='stable')
+    table = pa.Table.from_arrays(
+        [pa.array(ids[order]), pa.array(hashes[order])],
+        names=['id_evento_caso', 'hash']
+    )
+    return _write_table(directory, f'{version}.hashes.arrow', table)
+
+
+def content_hash(ids, hashes):
+    """
+    Returns the hash of the content of a snapshot from the hashes of its rows,
+    the same rows give the same hash whatever their order
+    """
+    order = np.argsort(ids, kind='stable')
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(ids[order]).tobytes())
+    digest.update(np.ascontiguousarray(hashes[order]).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def write_cube(directory, version, cube):
+    """
+    Writes the cube of counts of the snapshot. Returns the file name.
+    """
+    table = pa.Table.from_pandas(cube, preserve_index=False)
+    return _write_table(directory, f'{version}.cube.arrow', table)
+
+
+def write_indexes(directory, version, table):
+    """
+    Writes the table of the indexes of the snapshot, see Indexes.to_table. Returns the file name.
+    """
+    return _write_table(directory, f'{version}.indexes.arrow', table)
+
+
+def read_indexes(directory, manifest, memory_map):
+    """
+    Returns the table of the indexes of the snapshot or None if it has none
+    """
+    if not manifest.get('indexes'):
+        return None
+    return _read_table(os.path.join(directory, manifest['indexes']), memory_map)
+
+
+def read_cube(directory, manifest):
+    """
+    Returns the cube of counts of the snapshot or None if it has no cube
+    """
+    if not manifest.get('cube'):
+        return None
+    return _read(directory, manifest['cube'], memory_map=False)
+
+
+def read_hashes(directory, manifest):
+    """
+    Returns the ids and row hashes of the snapshot sorted by id, or None if it has no hashes
+    """
+    if not manifest.get('hashes'):
+        return None
+    table = _read_table(os.path.join(directory, manifest['hashes']), memory_map=False)
+    return table.column('id_evento_caso').to_numpy(), table.column('hash').to_numpy()
+
+
+def _read_table(path, memory_map):
+    if memory_map:
+        # The mapping stays open while the data frame references it
+        return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+    with pa.OSFile(path, 'rb') as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def _read(directory, file_name, memory_map, columns=None):
+    table = _read_table(os.path.join(directory, file_name), memory_map)
+    if columns is not None:
+        table = pa.Table.from_arrays([table.column(column) for column in columns], names=columns)
+    if memory_map:
+        return table.to_pandas(split_blocks=True)
+    return table.to_pandas()
+
+
+def read_file(directory, file_name, columns=None):
+    """
+    Returns the columns of a file of the snapshot, memory mapped
+    """
+    return _read(directory, file_name, memory_map=True, columns=columns)
+
+
+def load(directory, manifest, memory_map=False, columns=None):
+    """
+    Reads the snapshot described by the manifest into a data frame, only the given columns if any.
+    With memory_map the columns that need no conversion point straight into the mapped file,
+    so every process loading the same snapshot shares those pages through the page cache.
+    """
+    return _read(directory, manifest['file'], memory_map, columns)
@@ -0,0 +1,273 @@
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+from django.db.models import Count
+
+from covid_api.core.models import Case, CaseVersion
+from covid_api.core.services import schema, snapshot
+from covid_api.core.services.dataset import last_update
+
+# Cases inserted at a time by the load
+INSERT_ROWS = 10000
+
+# Seconds a load waits for another one to commit
+LOCK_TIMEOUT = 3600
+
+LOOKUPS = {
+    'eq': 'exact',
+    'ge': 'gte',
+    'le': 'lte',
+    'gt': 'gt',
+}
+
+
+class CasesNotLoaded(Exception):
+    """
+    The update has not loaded the cases into the database yet, the views answer it with a 503
+    """
+
+
+class Table:
+    """
+    The cases of the database, loaded from a version of the snapshot. Only its version is held
+    in memory, the queries run in the database.
+    """
+
+    def __init__(self, case_version):
+        self.case_version = case_version
+
+    @property
+    def version(self):
+        return self.case_version.version
+
+    def last_update(self):
+        return self.case_version.last_update
+
+    def __len__(self):
+        return self.case_version.cases
+
+    def cases(self):
+        return QuerySetWrapper(Case.objects.all(), self.case_version.columns.split(','), len(self))
+
+    @classmethod
+    def current(cls):
+        """
+        Returns the cases loaded in the database, None if they were never loaded
+        """
+        case_version = CaseVersion.objects.order_by('-id').first()
+        return cls(case_version) if case_version is not None else None
+
+
+def load(directory, manifest):
+    """
+    Replaces the cases of the database with the ones of the snapshot, in a single transaction,
+    unless they were already loaded from it. Returns the table.
+    Only the update loads the cases, the workers of the API wait for them, see CasesNotLoaded.
+    """
+    version = snapshot.manifest_version(manifest)
+    table = Table.current()
+    if table is not None and table.version == version:
+        return table
+
+    data_frame = schema.normalise(snapshot.load(directory, manifest))
+    fields = {field.name for field in Case._meta.fields}
+    columns = [column for column in data_frame.columns if column in fields]
+
+    names = ', '.join(connection.ops.quote_name(Case._meta.get_field(column).column) for column in columns)
+    statement = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(Case._meta.db_table), names, ', '.join(['%s'] * len(columns))
+    )
+    with transaction.atomic():
+        _lock()
+        # Another update may have loaded the same snapshot while this one read it
+        table = Table.current()
+        if table is not None and table.version == version:
+            return table
+
+        Case.objects.all().delete()
+        with connection.cursor() as cursor:
+            for start in range(0, len(data_frame.index), INSERT_ROWS):
+                chunk = data_frame.iloc[start:start + INSERT_ROWS]
+                cursor.executemany(statement, list(zip(*(_values(chunk[column]) for column in columns))))
+        CaseVersion.objects.all().delete()
+        case_version = CaseVersion.objects.create(
+            version=version,
+            last_update=last_update(manifest, data_frame),
+            cases=len(data_frame.index),
+            columns=','.join(columns),
+        )
+    if connection.vendor in ('sqlite', 'postgresql'):
+        # The statistics of the new indexes, the planner picks them from these
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    return Table(case_version)
+
+
+def _lock():
+    # Taken first in the transaction of a load, a second load waits for it to commit
+    table = connection.ops.quote_name(CaseVersion._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'LOCK TABLE {table} IN EXCLUSIVE MODE')
+        else:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'PRAGMA busy_timeout = {LOCK_TIMEOUT * 1000}')
+            # Any write locks the database in SQLite, even one that changes no row
+            cursor.execute(f'UPDATE {table} SET id = id')
+
+
+def _values(series):
+    # Values of a column for the database, None where they are missing
+    if pd.api.types.is_datetime64_dtype(series):
+        series = series.dt.strftime(schema.DATE_FORMAT)
+    values = np.asarray(series.values, dtype=object)
+    values[pd.isna(values)] = None
+    return values.tolist()
+
+
+def _frame(rows, columns):
+    """
+    Returns the rows read from the database with the types of the snapshot
+    """
+    data_frame = pd.DataFrame.from_records(list(rows), columns=columns)
+    for column in schema.DATES:
+        if column in data_frame:
+            data_frame[column] = pd.to_datetime(data_frame[column])
+    return schema.normalise(data_frame)
+
+
+class QuerySetWrapper:
+    """
+    Counterpart of DataFrameWrapper for the cases of the database. The filters build a query set,
+    the counts and the aggregations of the summaries run in the database.
+    """
+
+    weights = None
+
+    origin = None
+
+    def __init__(self, query_set, columns, rows, order='id', limit=None):
+        self._query_set = query_set
+        self._columns = columns
+        self._rows = rows
+        self._order = order
+        self._limit = limit
+        self._data_frame = None
+
+    def _filter(self, operator, column, value):
+        if value is None:
+            # Nothing equals a missing category, as in the data frames
+            self._query_set = self._query_set.none()
+        else:
+            if column in schema.DATES:
+                value = pd.Timestamp(value).date()
+            self._query_set = self._query_set.filter(**{f'{column}__{LOOKUPS[operator]}': value})
+        self._data_frame = None
+        return self
+
+    def _ordered(self):
+        # Ties are kept in the order of the snapshot, as the stable sort of the data frames does
+        query_set = self._query_set.order_by(*dict.fromkeys([self._order, 'id']))
+        return query_set[:self._limit] if self._limit is not None else query_set
+
+    @property
+    def data_frame(self):
+        if self._data_frame is None:
+            self._data_frame = _frame(self._ordered().values_list(*self._columns), self._columns)
+        return self._data_frame
+
+    def source_rows(self):
+        # Rows the filters run on
+        return self._rows
+
+    def query(self):
+        # Only the data frames can be selected again by the query pool
+        return None
+
+    def count(self):
+        if self._limit is not None:
+            return len(self.data_frame.index)
+        return self._query_set.count()
+
+    def crosstab(self, column, flag):
+        """
+        Returns the amount of rows for each category of column and value of the boolean flag,
+        counted in a single query. The last row counts the rows without a category.
+        """
+        categories = schema.CATEGORIES[column]
+        counts = np.zeros((len(categories) + 1, 2), dtype=np.int64)
+        for row in self._query_set.values(column, flag).annotate(count=Count('*')).order_by():
+            position = categories.index(row[column]) if row[column] in categories else len(categories)
+            counts[position, int(row[flag])] += row['count']
+        return pd.DataFrame(counts, index=list(categories) + [None], columns=[False, True])
+
+    def count_days(self, column, dates, by=None):
+        """
+        Returns the amount of rows for each of the dates of the date column, grouped by day in the database.
+        With by, one row of counts for each category of that column.
+        """
+        groups = schema.CATEGORIES[by] if by is not None else [None]
+        counts = np.zeros((len(groups), len(dates)), dtype=np.int64)
+        if len(dates):
+            first = dates[0].date()
+            rows = self._query_set.filter(**{f'{column}__gte': first, f'{column}__lte': dates[-1].date()})
+            keys = [by, column] if by is not None else [column]
+            for row in rows.values(*keys).annotate(count=Count('*')).order_by():
+                if by is not None and row[by] not in groups:
+                    continue
+                group = groups.index(row[by]) if by is not None else 0
+                counts[group, (row[column] - first).days] += row['count']
+        return counts if by is not None else counts[0]
+
+    def page(self, column, after=None, limit=None):
+        """
+        Keeps the rows with column greater than after, sorted by column, at most limit of them
+        """
+        if after is not None:
+            self.filter_gt(column, after)
+        self._order = column
+        self._limit = limit
+        self._data_frame = None
+        return self
+
+    def chunks(self, size):
+        """
+        Yields the rows that pass the filters, with the values of Covid19Casos.csv,
+        in data frames of at most size rows numbered from the first row
+        """
+        rows = self._ordered().values_list(*self._columns).iterator(chunk_size=size)
+        start = 0
+        while True:
+            chunk = list(islice(rows, size))
+            if not chunk:
+                break
+            chunk = _frame(chunk, self._columns)
+            chunk.index += start
+            start += len(chunk.index)
+            yield schema.to_external(chunk)
+
+    def copy(self):
+        return QuerySetWrapper(self._query_set, self._columns, self._rows, self._order, self._limit)
+
+    def filter_eq(self, column, value):
+        return self._filter('eq', column, value)
+
+    def filter_ge(self, column, value):
+        return self._filter('ge', column, value)
+
+    def filter_le(self, column, value):
+        return self._filter('le', column, value)
+
+    def filter_gt(self, column, value):
+        return self._filter('gt', column, value)
+
+    def to_frame(self):
+        """
+        Returns the rows with the values of Covid19Casos.csv, numbered from 0
+        """
+        return schema.to_external(self.data_frame.reset_index(drop=True))
+
+    def __getitem__(self, column):
+        return self.data_frame[column]
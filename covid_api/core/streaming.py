@@ -0,0 +1,29 @@
+from .renderers import frame_to_csv, frame_to_json
+from .services import DataFrameWrapper
+
+# Rows serialised at a time, the memory used by a stream does not depend on the size of the result
+STREAM_CHUNK_ROWS = 10000
+
+
+def stream_json(data: DataFrameWrapper):
+    """
+    Yields the rows of the data as a JSON array
+    """
+    yield '['
+    separator = ''
+    for chunk in data.chunks(STREAM_CHUNK_ROWS):
+        records = frame_to_json(chunk)[1:-1]
+        if records:
+            yield separator + records
+            separator = ','
+    yield ']'
+
+
+def stream_csv(data: DataFrameWrapper):
+    """
+    Yields the rows of the data as CSV, with the header only before the first chunk
+    """
+    header = True
+    for chunk in data.chunks(STREAM_CHUNK_ROWS):
+        yield frame_to_csv(chunk, header=header)
+        header = False
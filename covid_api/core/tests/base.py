@@ -0,0 +1,54 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+
+from benchmarks.generate import generate
+from covid_api.core.cache import response_cache
+from covid_api.core.services import CovidService, ingest, population
+
+
+class SnapshotTestCase(TestCase):
+    """
+    Serves a snapshot of synthetic cases, ingested for each test in a temporary directory
+    """
+
+    rows = 3000
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.snapshots = os.path.join(self.directory.name, 'snapshots')
+        self.csv_path = os.path.join(self.directory.name, 'Covid19Casos.csv')
+        generate(self.csv_path, self.rows, seed=2)
+        ingest.ingest(self.csv_path, self.snapshots, memory_limit_mb=1)
+
+        # The settings are read when the modules are imported
+        for module in ('covid_service', 'population'):
+            patcher = mock.patch(f'covid_api.core.services.{module}.COVID_SNAPSHOT_DIR', self.snapshots)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+        self.reset()
+        self.addCleanup(self.reset)
+
+    @staticmethod
+    def reset():
+        # The data and the responses of a previous test are not served
+        with CovidService._load_lock:
+            CovidService._dataset = None
+            CovidService._manifest_stat = None
+            CovidService.version = None
+        response_cache.clear()
+        response_cache.version = None
+        population._registry = None
+
+    def publish(self, csv_path):
+        """
+        Ingests the file as the new snapshot and waits for the service to load it
+        """
+        ingest.ingest(csv_path, self.snapshots, memory_limit_mb=1)
+        CovidService.dataset()
+        # Held by the background load until the new dataset is served
+        with CovidService._load_lock:
+            pass
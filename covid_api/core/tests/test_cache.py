@@ -0,0 +1,85 @@
+import os
+from unittest import mock
+
+import pandas as pd
+
+from covid_api.core.cache import response_cache
+from covid_api.core.services import CovidService, cube
+from covid_api.core.tests.base import SnapshotTestCase
+
+
+class ResponseCacheTestCase(SnapshotTestCase):
+
+    url = '/api/v1/summary/?classification=confirmed'
+
+    def test_response_has_an_etag(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertEqual(response['X-Data-Version'], CovidService.version)
+
+    def test_current_etag_is_not_modified(self):
+        response = self.client.get(self.url)
+
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+    def test_repeated_request_is_answered_from_the_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(len(response_cache._entries), 1)
+
+        cached = self.client.get(self.url)
+
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertEqual(cached['Content-Type'], response['Content-Type'])
+
+    def test_etag_depends_on_the_query_and_the_representation(self):
+        etags = {
+            self.client.get(self.url)['ETag'],
+            self.client.get('/api/v1/summary/?classification=suspect')['ETag'],
+            self.client.get(self.url + '&format=csv')['ETag'],
+            self.client.get(self.url, HTTP_ACCEPT='application/json; indent=4')['ETag'],
+        }
+
+        self.assertEqual(len(etags), 4)
+
+    def test_profile_parameter_is_not_part_of_the_query(self):
+        with mock.patch.object(cube, 'can_answer', wraps=cube.can_answer) as can_answer:
+            profiled = self.client.get(self.url + '&profile=true')
+        response = self.client.get(self.url)
+
+        self.assertEqual(list(can_answer.call_args[0][0]), ['classification'])
+        self.assertEqual(response['ETag'], profiled['ETag'])
+        self.assertEqual(len(response_cache._entries), 1)
+
+    def test_indented_response_is_not_served_without_indent(self):
+        indented = self.client.get(self.url, HTTP_ACCEPT='application/json; indent=4')
+
+        response = self.client.get(self.url)
+
+        self.assertNotEqual(response.content, indented.content)
+        self.assertNotIn(b'\n', response.content)
+
+    def test_new_version_invalidates_the_etag_and_the_cache(self):
+        response = self.client.get(self.url)
+        version = CovidService.version
+
+        cases = pd.read_csv(self.csv_path, dtype=str, keep_default_na=False)
+        cases.loc[:500, 'clasificacion_resumen'] = 'Confirmado'
+        changed = os.path.join(self.directory.name, 'changed.csv')
+        cases.to_csv(changed, index=False)
+        self.publish(changed)
+
+        updated = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertNotEqual(CovidService.version, version)
+        self.assertEqual(updated.status_code, 200)
+        self.assertNotEqual(updated['ETag'], response['ETag'])
+        self.assertNotEqual(updated.content, response.content)
+        self.assertEqual(updated['X-Data-Version'], CovidService.version)
+        self.assertEqual(response_cache.version, CovidService.version)
@@ -0,0 +1,146 @@
+import hashlib
+import http.server
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from covid_api.core.services import download
+
+
+class Upstream(http.server.BaseHTTPRequestHandler):
+    """
+    Serves the content of the server with an ETag, answering the conditional and range requests.
+    The first response is cut after server.cut bytes when it is set.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        etag = '"{}"'.format(hashlib.md5(server.content).hexdigest())
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        start = 0
+        if self.headers.get('Range') and self.headers.get('If-Range') == etag:
+            start = int(self.headers['Range'].split('=')[1].split('-')[0])
+            if start >= len(server.content):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(server.content)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(server.content) - 1}/{len(server.content)}')
+        else:
+            self.send_response(200)
+
+        body = server.content[start:]
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if server.cut is not None:
+            cut, server.cut = server.cut, None
+            self.wfile.write(body[:cut])
+            self.wfile.flush()
+            self.connection.shutdown(2)
+            return
+        self.wfile.write(body)
+
+
+class DownloadTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+        self.server.content = os.urandom(200000)
+        self.server.cut = None
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/Covid19Casos.csv'
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'Covid19Casos.csv')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def read(self):
+        with open(self.path, 'rb') as downloaded:
+            return downloaded.read()
+
+    def test_download_publishes_the_file(self):
+        self.assertTrue(download.download(self.url, self.path))
+        self.assertEqual(self.read(), self.server.content)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ['Covid19Casos.csv', 'Covid19Casos.csv.meta.json'])
+
+    def test_not_modified_skips_the_download(self):
+        download.download(self.url, self.path)
+        self.server.requests.clear()
+
+        self.assertFalse(download.download(self.url, self.path))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertIn('If-None-Match', self.server.requests[0])
+        self.assertEqual(self.read(), self.server.content)
+
+    def test_interrupted_download_is_resumed(self):
+        self.server.cut = 50000
+
+        self.assertTrue(download.download(self.url, self.path))
+        self.assertEqual(self.read(), self.server.content)
+        first, resumed = self.server.requests
+        self.assertNotIn('Range', first)
+        self.assertEqual(resumed['Range'], 'bytes=50000-')
+        self.assertIn('If-Range', resumed)
+
+    def test_changed_file_restarts_the_download(self):
+        self.server.cut = 50000
+        with self.assertRaises(OSError):
+            download.download(self.url, self.path, retries=1)
+        self.assertFalse(os.path.exists(self.path))
+
+        # The If-Range does not match anymore, the whole new file is sent
+        self.server.content = os.urandom(100000)
+        self.server.requests.clear()
+        self.assertTrue(download.download(self.url, self.path))
+        self.assertEqual(self.read(), self.server.content)
+        self.assertIn('Range', self.server.requests[0])
+
+    def test_unsatisfiable_range_restarts_the_download(self):
+        self.server.cut = 50000
+        with self.assertRaises(OSError):
+            download.download(self.url, self.path, retries=1)
+        # The partial file is longer than the file upstream
+        with open(f'{self.path}.part', 'ab') as part_file:
+            part_file.write(os.urandom(len(self.server.content)))
+
+        self.server.requests.clear()
+        self.assertTrue(download.download(self.url, self.path))
+        self.assertEqual(self.read(), self.server.content)
+        unsatisfiable, restarted = self.server.requests
+        self.assertIn('Range', unsatisfiable)
+        self.assertNotIn('Range', restarted)
+
+    def test_file_is_only_replaced_once_complete(self):
+        download.download(self.url, self.path)
+        previous = self.server.content
+
+        self.server.content = os.urandom(100000)
+        self.server.cut = 50000
+        with self.assertRaises(OSError):
+            download.download(self.url, self.path, retries=1)
+        self.assertEqual(self.read(), previous)
+
+        with mock.patch('covid_api.core.services.download.os.replace', wraps=os.replace) as replace:
+            self.assertTrue(download.download(self.url, self.path))
+        replace.assert_any_call(f'{self.path}.part', self.path)
+        self.assertEqual(self.read(), self.server.content)
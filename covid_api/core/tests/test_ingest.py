@@ -0,0 +1,112 @@
+import os
+import tempfile
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from benchmarks.generate import generate
+from covid_api.core.services import cube, ingest, schema, snapshot
+
+
+def _sorted_cube(counts):
+    # Added to nothing, the counts of each combination are summed and the empty ones dropped
+    counts = cube.add(counts)
+    return counts.sort_values(cube.DIMENSIONS).reset_index(drop=True)
+
+
+class IncrementalIngestTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.snapshots = os.path.join(self.directory.name, 'snapshots')
+        self.csv_path = os.path.join(self.directory.name, 'Covid19Casos.csv')
+        generate(self.csv_path, 5000, seed=1)
+        self.cases = pd.read_csv(self.csv_path, dtype=str, keep_default_na=False)
+        ingest.ingest(self.csv_path, self.snapshots, memory_limit_mb=1)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, cases):
+        path = os.path.join(self.directory.name, 'changed.csv')
+        cases.to_csv(path, index=False)
+        return path
+
+    def rebuild(self, csv_path):
+        """
+        Returns the manifest of a full ingest of the file
+        """
+        directory = os.path.join(self.directory.name, 'full')
+        ingest.ingest(csv_path, directory, memory_limit_mb=1)
+        return directory, snapshot.read_manifest(directory)
+
+    def load(self, directory, manifest):
+        data_frame = schema.normalise(snapshot.load(directory, manifest))
+        return data_frame.sort_values('id_evento_caso').reset_index(drop=True)
+
+    def test_inserted_and_updated_cases_are_folded_into_a_new_base(self):
+        cases = self.cases.copy()
+        cases.loc[10:39, 'clasificacion_resumen'] = 'Descartado'
+        cases.loc[10:39, 'fallecido'] = 'NO'
+        updated = (cases != self.cases).any(axis=1).sum()
+        inserted = cases.iloc[:25].copy()
+        inserted['id_evento_caso'] = [str(case_id) for case_id in range(10 ** 8, 10 ** 8 + 25)]
+        csv_path = self.write(pd.concat([cases, inserted]))
+
+        stats = ingest.ingest_incremental(csv_path, self.snapshots, memory_limit_mb=1)
+        manifest = snapshot.read_manifest(self.snapshots)
+        directory, full = self.rebuild(csv_path)
+
+        self.assertEqual(stats['mode'], 'incremental')
+        self.assertEqual(stats['inserted'], 25)
+        self.assertEqual(stats['updated'], updated)
+        self.assertEqual(manifest['rows'], 5025)
+        self.assertEqual(manifest['content_hash'], full['content_hash'])
+        pd.testing.assert_frame_equal(self.load(self.snapshots, manifest), self.load(directory, full))
+
+    def test_patched_cube_counts_the_whole_snapshot(self):
+        cases = self.cases.copy()
+        cases.loc[100:199, 'clasificacion_resumen'] = 'Confirmado'
+        cases.loc[100:149, 'fecha_diagnostico'] = '2020-06-01'
+        csv_path = self.write(cases)
+
+        ingest.ingest_incremental(csv_path, self.snapshots, memory_limit_mb=1)
+        manifest = snapshot.read_manifest(self.snapshots)
+        directory, full = self.rebuild(csv_path)
+
+        patched = snapshot.read_cube(self.snapshots, manifest)
+        expected = cube.build(self.load(directory, full))
+        pd.testing.assert_frame_equal(_sorted_cube(patched), _sorted_cube(expected))
+
+    def test_unchanged_file_publishes_nothing(self):
+        manifest = snapshot.read_manifest(self.snapshots)
+
+        stats = ingest.ingest_incremental(self.csv_path, self.snapshots, memory_limit_mb=1)
+
+        self.assertEqual((stats['mode'], stats['inserted'], stats['updated']), ('incremental', 0, 0))
+        self.assertEqual(snapshot.read_manifest(self.snapshots), manifest)
+
+    def test_deleted_cases_rebuild_the_snapshot(self):
+        csv_path = self.write(self.cases.drop(index=range(10)))
+
+        stats = ingest.ingest_incremental(csv_path, self.snapshots, memory_limit_mb=1)
+
+        self.assertEqual(stats['mode'], 'full')
+        self.assertEqual(snapshot.read_manifest(self.snapshots)['rows'], 4990)
+
+    def test_many_changed_cases_rebuild_the_snapshot(self):
+        cases = self.cases.copy()
+        cases.loc[:2000, 'fallecido'] = 'SI'
+        csv_path = self.write(cases)
+
+        stats = ingest.ingest_incremental(csv_path, self.snapshots, memory_limit_mb=1)
+
+        self.assertEqual(stats['mode'], 'full')
+
+    def test_missing_snapshot_is_built(self):
+        directory = os.path.join(self.directory.name, 'empty')
+
+        stats = ingest.ingest_incremental(self.csv_path, directory, memory_limit_mb=1)
+
+        self.assertEqual(stats['mode'], 'full')
+        self.assertEqual(snapshot.read_manifest(directory)['rows'], 5000)
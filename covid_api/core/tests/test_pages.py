@@ -0,0 +1,71 @@
+import json
+import re
+
+from covid_api.core.services import CovidService
+from covid_api.core.tests.base import SnapshotTestCase
+
+
+def _next_url(response):
+    # The url of the rel="next" Link, None on the last page
+    match = re.match(r'<(.+)>; rel="next"', response.get('Link', ''))
+    return match.group(1) if match else None
+
+
+class CursorPagesTestCase(SnapshotTestCase):
+
+    def ids(self, **filters):
+        data = CovidService.get_data()
+        for column, value in filters.items():
+            data = data.filter_eq(column, value)
+        return sorted(data['id_evento_caso'].tolist())
+
+    def follow(self, url):
+        """
+        Returns the ids of every page following the Link headers from url, and the amount of pages
+        """
+        ids, pages = [], 0
+        while url is not None:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [case['id_evento_caso'] for case in json.loads(response.content)]
+            pages += 1
+            url = _next_url(response)
+        return ids, pages
+
+    def test_pages_hold_every_case_once_sorted_by_id(self):
+        ids, pages = self.follow('/api/v1/?limit=700')
+
+        self.assertEqual(ids, self.ids())
+        self.assertEqual(pages, 5)
+
+    def test_page_starts_after_the_cursor(self):
+        ids = self.ids()
+
+        response = self.client.get(f'/api/v1/?limit=10&cursor={ids[99]}')
+
+        cases = json.loads(response.content)
+        self.assertEqual([case['id_evento_caso'] for case in cases], ids[100:110])
+        self.assertIn(f'cursor={ids[109]}', _next_url(response))
+
+    def test_default_page_size(self):
+        response = self.client.get('/api/v1/')
+
+        self.assertEqual(len(json.loads(response.content)), 1000)
+        self.assertIsNotNone(_next_url(response))
+
+    def test_pages_keep_the_filters(self):
+        ids, _ = self.follow('/api/v1/province/06/?limit=100&classification=confirmed')
+
+        self.assertEqual(ids, self.ids(carga_provincia_nombre='Buenos Aires', clasificacion_resumen='Confirmado'))
+
+    def test_stream_sends_every_case(self):
+        response = self.client.get('/api/v1/?stream=true')
+
+        cases = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([case['id_evento_caso'] for case in cases], self.ids())
+        self.assertFalse(response.has_header('Link'))
+
+    def test_invalid_cursor_or_limit(self):
+        for query in ('cursor=abc', 'limit=abc', 'limit=0'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/v1/?{query}').status_code, 400)
@@ -0,0 +1,64 @@
+import os
+from unittest import mock
+
+import pandas as pd
+
+from covid_api.core.services import CovidService, covid_service, cube, pool
+from covid_api.core.tests.base import SnapshotTestCase
+
+
+URLS = [
+    'stats/',
+    'province/14/stats/',
+    'summary/?classification=confirmed&from=2020-04-01',
+    'province/06/summary/?dead=true',
+    'provinces/summary/?from=2020-06-01&to=2020-06-10',
+]
+
+
+class QueryPoolTestCase(SnapshotTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # The worker processes are spawned, they read the directory of the snapshot from the environment
+        patcher = mock.patch.dict(os.environ, {'COVID_SNAPSHOT_DIR': self.snapshots})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        pool.configure(1)
+        self.addCleanup(pool.configure, 0)
+
+    def test_worker_answers_the_query(self):
+        data = CovidService.get_data().filter_eq('clasificacion_resumen', 'Confirmado')
+        dates = pd.date_range('2020-03-01', '2020-06-01')
+
+        summary = pool.run(pool.summary, CovidService.dataset().version, data.query(), dates)
+
+        pd.testing.assert_frame_equal(summary, covid_service.summary_frame(data, dates))
+
+    def test_worker_of_another_version_does_not_answer(self):
+        data = CovidService.get_data()
+
+        self.assertIsNone(pool.run(pool.province_stats, 'another', data.query()))
+
+    def test_views_answer_from_the_workers(self):
+        # As the queries the cube can not answer. The counts of the server fail, only the workers answer
+        with mock.patch.object(cube, 'can_answer', return_value=False), \
+                mock.patch.object(covid_service, 'summary_frame', side_effect=AssertionError), \
+                mock.patch.object(covid_service, 'province_summaries', side_effect=AssertionError), \
+                mock.patch.object(covid_service, 'province_stats', side_effect=AssertionError):
+            pooled = {url: self.client.get('/api/v1/' + url) for url in URLS}
+
+        self.reset()
+        pool.configure(0)
+        for url, response in pooled.items():
+            with self.subTest(url=url):
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, self.client.get('/api/v1/' + url).content)
+
+    def test_query_that_takes_too_long_answers_503(self):
+        with mock.patch.object(cube, 'can_answer', return_value=False), \
+                mock.patch('covid_api.core.services.pool.COVID_QUERY_TIMEOUT', 0.001):
+            response = self.client.get('/api/v1/summary/')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['detail'], 'The query took too long, try again later.')
@@ -0,0 +1,32 @@
+from unittest import mock
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from covid_api.core.services import schema
+
+
+class NormaliseTestCase(SimpleTestCase):
+
+    def test_values_outside_the_categories_are_logged(self):
+        cases = pd.DataFrame({
+            'carga_provincia_nombre': ['Neuquén', 'Neuquen', None, 'Neuquen', 'Antártida'],
+            'clasificacion_resumen': ['Confirmado', 'Descartado', 'Sospechoso', None, 'Confirmado'],
+        })
+
+        with self.assertLogs('covid_api.core.services.schema', 'WARNING') as logs:
+            cases = schema.normalise(cases)
+
+        self.assertEqual(logs.output, [
+            "WARNING:covid_api.core.services.schema:3 values of carga_provincia_nombre outside its categories "
+            "are read as missing: 'Neuquen', 'Antártida'"
+        ])
+        self.assertEqual(cases['carga_provincia_nombre'].isna().sum(), 4)
+
+    def test_known_values_are_not_logged(self):
+        cases = pd.DataFrame({'sexo': ['F', 'M', 'NR', None]})
+
+        with mock.patch.object(schema.logger, 'warning') as warning:
+            schema.normalise(cases)
+
+        warning.assert_not_called()
@@ -0,0 +1,73 @@
+from unittest import mock
+
+from covid_api.core.models import Case
+from covid_api.core.services import CovidService, snapshot, sql
+from covid_api.core.tests.base import SnapshotTestCase
+
+URLS = [
+    '',
+    '?limit=25&cursor=5000',
+    '?limit=40&format=csv',
+    '?classification=confirmed&dead=true&stream=true',
+    '?classification=confirmed&dead=true&stream=true&format=csv',
+    'count/',
+    'count/?classification=confirmed&icu=true',
+    'count/?dead=true&from=2020-05-01&to=2020-06-01',
+    'count/?respirator=false&from=2020-05-01',
+    'stats/',
+    'summary/',
+    'summary/?classification=confirmed&from=2020-04-01&to=2020-05-01',
+    'summary/?dead=true&format=csv',
+    'last_update/',
+    'provinces/summary/?from=2020-06-01&to=2020-06-10',
+    'province/06/?classification=confirmed&limit=100',
+    'province/06/?dead=true&stream=true',
+    'province/14/stats/',
+    'province/14/count/?dead=true',
+    'province/02/summary/?from=2020-04-01&to=2020-05-01&format=csv',
+]
+
+
+class SqlBackendTestCase(SnapshotTestCase):
+
+    def get(self, url):
+        response = self.client.get('/api/v1/' + url)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, content
+
+    def sql_backend(self):
+        patcher = mock.patch('covid_api.core.services.covid_service.COVID_QUERY_BACKEND', 'sql')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.reset()
+
+    def test_sql_answers_as_the_data_frames(self):
+        expected = {url: self.get(url) for url in URLS}
+        self.assertEqual({status_code for status_code, _ in expected.values()}, {200})
+
+        sql.load(self.snapshots, snapshot.read_manifest(self.snapshots))
+        self.sql_backend()
+
+        for url in URLS:
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url), expected[url])
+        self.assertIsInstance(CovidService.dataset(), sql.Table)
+
+    def test_cases_are_not_loaded_by_the_requests(self):
+        self.sql_backend()
+
+        status_code, _ = self.get('count/')
+
+        self.assertEqual(status_code, 503)
+        self.assertFalse(Case.objects.exists())
+
+    def test_same_snapshot_is_not_loaded_again(self):
+        manifest = snapshot.read_manifest(self.snapshots)
+        table = sql.load(self.snapshots, manifest)
+
+        with mock.patch('covid_api.core.services.sql.Case.objects') as objects:
+            self.assertEqual(sql.load(self.snapshots, manifest).version, table.version)
+        objects.all.assert_not_called()
+        self.assertEqual(len(table), self.rows)
+        self.assertEqual(table.version, snapshot.manifest_version(manifest))
+        self.assertEqual(table.last_update(), manifest['last_update'])
@@ -1,15 +1,28 @@
-from django.urls import path
+from django.urls import path, re_path
 
 from covid_api.core import views
+from covid_api.core.async_views import async_view
+from covid_api.core.profiling import profiled
+from covid_api.settings import ASYNC_VIEWS
+
+
+def as_view(view_class, cheap=False):
+    view = profiled(view_class.as_view())
+    return async_view(view, cheap) if ASYNC_VIEWS else view
+
 
 urlpatterns = [
-    path('count/', views.CountView.as_view(), name='all-count'),
-    path('stats/', views.StatsView.as_view(), name='all-count'),
-    path('summary/', views.CountrySummaryView.as_view(), name='country-summary-view'),
-    path('last_update/', views.LastUpdateView.as_view(), name='last-update'),
-    path('provinces/', views.ProvincesListView.as_view(), name='provinces-view'),
-    path('province/<str:province_slug>/', views.ProvinceListView.as_view(), name='province-view'),
-    path('province/<str:province_slug>/stats/', views.ProvinceStatsView.as_view(), name='province-stats-view'),
-    path('province/<str:province_slug>/count/', views.ProvinceCountView.as_view(), name='province-count-view'),
-    path('province/<str:province_slug>/summary/', views.ProvinceSummaryView.as_view(), name='province-summary-view'),
+    path('', as_view(views.ListView), name='all-list'),
+    path('count/', as_view(views.CountView), name='all-count'),
+    path('stats/', as_view(views.StatsView), name='all-count'),
+    path('summary/', as_view(views.CountrySummaryView), name='country-summary-view'),
+    path('last_update/', as_view(views.LastUpdateView, cheap=True), name='last-update'),
+    path('provinces/', as_view(views.ProvincesListView, cheap=True), name='provinces-view'),
+    # Scrapers do not always follow the redirect that appends the slash
+    re_path(r'^metrics/?$', as_view(views.MetricsView, cheap=True), name='metrics'),
+    path('provinces/summary/', as_view(views.ProvincesSummaryView), name='provinces-summary-view'),
+    path('province/<str:province_slug>/', as_view(views.ProvinceListView), name='province-view'),
+    path('province/<str:province_slug>/stats/', as_view(views.ProvinceStatsView), name='province-stats-view'),
+    path('province/<str:province_slug>/count/', as_view(views.ProvinceCountView), name='province-count-view'),
+    path('province/<str:province_slug>/summary/', as_view(views.ProvinceSummaryView), name='province-summary-view'),
 ]
@@ -1,25 +1,78 @@
 from datetime import datetime
 from itertools import islice
 
-import xlrd
 from drf_yasg import openapi
 from drf_yasg.openapi import Parameter
+from django.http import HttpResponse, StreamingHttpResponse
 from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from rest_framework.views import APIView
-from rest_framework_csv.renderers import CSVRenderer
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView, exception_handler
 
+from . import metrics
+from .cache import cached_response
 from .models import Province, Classification
-from .services import CovidService, DataFrameWrapper
+from .services import CovidService, DataFrameWrapper, pool, population, sql
 from .parameters import DateParameter, ClassificationParameter
+from .renderers import DataFrameCSVRenderer, DataFrameJSONRenderer
+from .streaming import stream_csv, stream_json
+
+
+# ----- ERRORS ----- #
+
+class QueryTimeout(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The query took too long, try again later.'
+    default_code = 'query_timeout'
+
+
+class CasesNotLoaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The cases are not loaded into the database yet, try again later.'
+    default_code = 'cases_not_loaded'
+
+
+def handle_exception(exc, context):
+    """
+    Answers the errors of the services as the API does, set as the EXCEPTION_HANDLER of the views
+    """
+    if isinstance(exc, pool.QueryTimeout):
+        exc = QueryTimeout()
+    elif isinstance(exc, sql.CasesNotLoaded):
+        exc = CasesNotLoaded()
+    return exception_handler(exc, context)
 
 
 # ----- GENERIC VIEWS ----- #
 
+class SessionlessMixin:
+    """
+    Views answered on the event loop by the async views, they must not touch the session
+    """
+
+    authentication_classes = []
+
+
 class ProcessDataView(APIView):
 
-    renderer_classes = [JSONRenderer, CSVRenderer]
+    renderer_classes = [DataFrameJSONRenderer, DataFrameCSVRenderer]
+
+    # Views that only count cases answer from the cube of counts when the query allows it
+    aggregated = False
+
+    # Views that return the cases accept the cursor, limit and stream parameters
+    paginated = False
+
+    # Size of the pages when the request has no limit, None returns every case
+    default_limit = None
+
+    def get_data(self, request, **kwargs) -> DataFrameWrapper:
+        if self.aggregated:
+            return CovidService.get_aggregated_data(request.GET.keys())
+        return CovidService.get_data()
 
     def process_data(self, request, data: DataFrameWrapper, **kwargs) -> DataFrameWrapper:
         return data
@@ -31,23 +84,23 @@ class ProcessDataView(APIView):
             data.filter_eq('clasificacion_resumen', classification)
         icu = request.GET.get('icu', None)
         if icu is not None:
-            value = 'SI' if icu.lower() == "true" else 'NO'
+            value = icu.lower() == "true"
             data = data.filter_eq('cuidado_intensivo', value)
         respirator = request.GET.get('respirator', None)
         if respirator is not None:
-            value = 'SI' if respirator.lower() == "true" else 'NO'
+            value = respirator.lower() == "true"
             data = data.filter_eq('asistencia_respiratoria_mecanica', value)
         dead = request.GET.get('dead', None)
         if dead is not None:
-            value = 'SI' if dead.lower() == "true" else 'NO'
+            value = dead.lower() == "true"
             data = data.filter_eq('fallecido', value)
-        from_date = request.GET.get('from', None)
+        from_date = self.get_date(request, 'from')
         if from_date is not None:
             if dead == 'true':
                 data = data.filter_ge('fecha_fallecimiento', from_date)
             else:
                 data = data.filter_ge('fecha_diagnostico', from_date)
-        to_date = request.GET.get('to', None)
+        to_date = self.get_date(request, 'to')
         if to_date is not None:
             if dead == 'true':
                 data = data.filter_le('fecha_fallecimiento', to_date)
@@ -55,9 +108,60 @@ class ProcessDataView(APIView):
                 data = data.filter_le('fecha_diagnostico', to_date)
         return data
 
+    @staticmethod
+    def get_date(request, name):
+        """
+        Returns the date of the query parameter, None if the query does not have it
+        """
+        value = request.GET.get(name, None)
+        if value is not None:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                raise ParseError(f'{name} must be a date as yyyy-mm-dd')
+        return value
+
+    def paginate(self, request, data: DataFrameWrapper):
+        """
+        Returns the page of the cases after the cursor, sorted by id_evento_caso, and the cursor of the next page.
+        The cursor is the id_evento_caso of the last case of the previous page.
+        """
+        cursor = request.GET.get('cursor', None)
+        limit = request.GET.get('limit', self.default_limit)
+        if cursor is None and limit is None:
+            return data, None
+        try:
+            cursor = int(cursor) if cursor is not None else None
+            limit = int(limit) if limit is not None else None
+        except ValueError:
+            raise ParseError('cursor and limit must be integers')
+        if limit is not None and limit < 1:
+            raise ParseError('limit must be positive')
+
+        data = data.page('id_evento_caso', cursor, limit)
+        next_cursor = None
+        if limit is not None and data.count() == limit:
+            next_cursor = int(data['id_evento_caso'].iloc[-1])
+        return data, next_cursor
+
     def create_response(self, request, data: DataFrameWrapper, **kwargs) -> Response:
+        if not self.paginated:
+            return Response(data.to_frame())
+
+        data, next_cursor = self.paginate(request, data)
+        if request.GET.get('stream', '').lower() == 'true':
+            # The rows are serialised in chunks while they are sent
+            if request.accepted_renderer.format == 'csv':
+                response = StreamingHttpResponse(stream_csv(data), content_type='text/csv; charset=utf-8')
+            else:
+                response = StreamingHttpResponse(stream_json(data), content_type='application/json')
+        else:
+            response = Response(data.to_frame())
 
-        return Response(data.to_json())
+        if next_cursor is not None:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+            response['Link'] = f'<{next_url}>; rel="next"'
+        return response
 
     @swagger_auto_schema(
         manual_parameters=[
@@ -69,11 +173,20 @@ class ProcessDataView(APIView):
             DateParameter("to"),
         ],
     )
+    @cached_response
     def get(self, request, **kwargs):
-        data = CovidService.get_data()
-        data = self.filter_data(request, data, **kwargs)
-        data = self.process_data(request, data, **kwargs)
-        response = self.create_response(request, data, **kwargs)
+        timings = metrics.timings(request)
+        with timings.stage('get_data'):
+            data = self.get_data(request, **kwargs)
+        timings.rows_scanned = data.source_rows()
+        # The filters are evaluated by the first stage that needs the rows
+        with timings.stage('filter_data'):
+            data = self.filter_data(request, data, **kwargs)
+        with timings.stage('process_data'):
+            data = self.process_data(request, data, **kwargs)
+        with timings.stage('create_response'):
+            response = self.create_response(request, data, **kwargs)
+        timings.rows_returned = metrics.returned_rows(getattr(response, 'data', None))
         return response
 
 
@@ -84,10 +197,28 @@ class CountView(ProcessDataView):
 
     renderer_classes = [JSONRenderer, ]
 
+    aggregated = True
+
     def create_response(self, request, data: DataFrameWrapper, **kwargs) -> Response:
         return Response({'count': data.count()})
 
 
+class ListView(ProcessDataView):
+    """
+    Returns the cases after applying the filters, a page at a time unless they are streamed
+    """
+
+    paginated = True
+
+    default_limit = 1000
+
+    def create_response(self, request, data: DataFrameWrapper, **kwargs) -> Response:
+        if request.GET.get('stream', '').lower() == 'true' and 'limit' not in request.GET:
+            # The stream sends every case without holding them in memory
+            self.default_limit = None
+        return super().create_response(request, data, **kwargs)
+
+
 # --- PROVINCE VIEWS --- #
 
 class ProvinceListView(ProcessDataView):
@@ -95,6 +226,8 @@ class ProvinceListView(ProcessDataView):
     Returns the cases for the given province
     """
 
+    paginated = True
+
     def process_data(self, request, data: DataFrameWrapper, province_slug=None, **kwargs) -> Response:
         province = Province.from_slug(province_slug)
         summary = data.filter_eq(
@@ -113,6 +246,8 @@ class ProvinceCountView(ProvinceListView, CountView):
 
 class ProvinceSummaryView(ProcessDataView):
 
+    aggregated = True
+
     def process_data(self, request, data: DataFrameWrapper, province_slug=None, **kwargs) -> DataFrameWrapper:
         from_date = request.GET.get('from', None)
         to_date = request.GET.get('to', None)
@@ -133,7 +268,7 @@ class ProvinceSummaryView(ProcessDataView):
 
 # --- PROVINCES VIEWS --- #
 
-class ProvincesListView(APIView):
+class ProvincesListView(SessionlessMixin, APIView):
     """
     Returns the provinces with their respective slug
     """
@@ -143,23 +278,46 @@ class ProvincesListView(APIView):
         return Response(province_array)
 
 
+class ProvincesSummaryView(ProcessDataView):
+    """
+    Returns the summary of every province keyed by slug, in CSV the slug is a column
+    """
+
+    aggregated = True
+
+    def get_renderer_context(self):
+        context = super().get_renderer_context()
+        context['key_column'] = 'slug'
+        return context
+
+    def process_data(self, request, data: DataFrameWrapper, **kwargs):
+        from_date = request.GET.get('from', None)
+        to_date = request.GET.get('to', None)
+
+        return CovidService.province_summaries(from_date, to_date, data)
+
+    def create_response(self, request, summaries, **kwargs) -> Response:
+        return Response(summaries)
+
+
 # --- LAST UPDATE VIEW --- #
 
-class LastUpdateView(APIView):
+class LastUpdateView(SessionlessMixin, APIView):
     """
     Returns the date that the file was last updated
     """
 
     def get(self, request, **kwargs):
-        data = CovidService.get_data()
-        last_update = data['ultima_actualizacion'].max()
-        return Response({'last_update': last_update})
+        last_update = CovidService.last_update()
+        return Response({'last_update': last_update, 'version': CovidService.version})
 
 
 # --- COUNTRY SUMMARY VIEW --- #
 
 class CountrySummaryView(ProcessDataView):
 
+    aggregated = True
+
     def process_data(self, request, data: DataFrameWrapper, **kwargs) -> DataFrameWrapper:
         from_date = request.GET.get('from', None)
         to_date = request.GET.get('to', None)
@@ -177,12 +335,12 @@ class StatsView(APIView):
     Returns the provinces and country stats.
     """
 
-    def province_stats(self, province_name, province_data, population):
+    def province_stats(self, province_name, stats, population):
         # Get population from 2020
-        cases_amount = province_data.count()
+        cases_amount = int(stats.loc[province_name, 'casos'])
         cases_per_million = cases_amount * 1000000 / population
         cases_per_hundred_thousand = cases_amount * 100000 / population
-        dead_amount = province_data.filter_eq('fallecido', 'SI').count()
+        dead_amount = int(stats.loc[province_name, 'muertes'])
         dead_per_million = dead_amount * 1000000 / population
         dead_per_hundred_thousand = dead_amount * 100000 / population
         stats = {
@@ -196,37 +354,25 @@ class StatsView(APIView):
             }
         return stats
 
+    @cached_response
     def get(self, requests):
-        workbook = xlrd.open_workbook('poblacion.xls')
+        timings = metrics.timings(requests)
         response = []
-        data = CovidService.get_data()
-        # Filter the data
-        data = data.filter_eq('clasificacion_resumen', 'Confirmado')
-        for worksheet in workbook.sheets():
-            split_name = worksheet.name.split('-')
-            if len(split_name) < 2:
-                continue
-
-            province_slug = split_name[0]
-            province_name = Province.from_slug(province_slug)
-            if province_name:
-                province_data = data.copy().filter_eq(
-                    'carga_provincia_nombre',
-                    province_name
+        # Cases and deaths of every province counted at once
+        with timings.stage('province_stats'):
+            stats = CovidService.province_stats()
+        with timings.stage('population'):
+            for province_slug, province_population in population.registry().items():
+                province_name = Province.from_slug(province_slug) or "Argentina"
+
+                province_stats = self.province_stats(
+                    province_name,
+                    stats,
+                    province_population
                 )
-                population = worksheet.cell(16, 1).value
-            else:
-                province_data = data.copy()
-                province_name = "Argentina"
-                population = worksheet.cell(15, 1).value
-
-            province_stats = self.province_stats(
-                province_name,
-                province_data,
-                population
-            )
-            response.append(province_stats)
+                response.append(province_stats)
 
+        timings.rows_returned = len(response)
         return Response(response)
 
 
@@ -234,23 +380,66 @@ class ProvinceStatsView(StatsView):
     """
     Returns a province stats.
     """
+    @cached_response
     def get(self, requests, province_slug=None):
-        workbook = xlrd.open_workbook('poblacion.xls')
-        data = CovidService.get_data()
-        # Filter the data
-        data = data.filter_eq('clasificacion_resumen', 'Confirmado')
+        timings = metrics.timings(requests)
+        with timings.stage('province_stats'):
+            stats = CovidService.province_stats()
         province_name = Province.from_slug(province_slug)
-        province_data = data.filter_eq(
-            'carga_provincia_nombre',
-            province_name
-        )
-        sheet_name = f'{province_slug}-{province_name.upper()}'
-        population = workbook.sheet_by_name(sheet_name).cell(16, 1).value
 
-        province_stats = self.province_stats(
-            province_name,
-            province_data,
-            population
-        )
+        with timings.stage('population'):
+            province_stats = self.province_stats(
+                province_name,
+                stats,
+                population.get(province_slug)
+            )
 
-        return Response(province_stats)
\ No newline at end of file
+        timings.rows_returned = 1
+        return Response(province_stats)
+
+
+# --- PROMETHEUS METRICS VIEW --- #
+
+class MetricsView(SessionlessMixin, APIView):
+    """
+    Returns the metrics of the worker that answers in the Prometheus text format
+    """
+
+    def get(self, request, **kwargs):
+        gauges = [
+            metrics.gauge('covid_api_dataset_loaded', 'Whether the data is loaded.', int(CovidService.is_loaded())),
+        ]
+        if CovidService.is_loaded():
+            dataset = CovidService.dataset()
+            gauges.append(metrics.gauge(
+                'covid_api_dataset_info', 'Version of the data being served.', 1,
+                version=dataset.version, last_update=dataset.last_update()
+            ))
+            gauges.append(metrics.gauge(
+                'covid_api_dataset_rows', 'Cases of the data being served.', len(dataset)
+            ))
+        return HttpResponse(metrics.render(*gauges), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --- READINESS VIEW --- #
+
+class ReadyView(SessionlessMixin, APIView):
+    """
+    Returns whether the worker that answers has the data loaded, and its version.
+    Answers 503 until it is loaded, the first request starts loading it.
+    """
+
+    renderer_classes = [JSONRenderer]
+
+    def get(self, request, **kwargs):
+        if not CovidService.is_loaded():
+            CovidService.start_loading()
+            return Response({'ready': False, 'version': None}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        dataset = CovidService.dataset()
+        return Response({
+            'ready': True,
+            'version': dataset.version,
+            'last_update': dataset.last_update(),
+            'rows': len(dataset),
+        })
@@ -0,0 +1,26 @@
+import gc
+
+from django.db import connections
+from django.urls import get_resolver
+
+from covid_api.core.services import CovidService, population, sql
+
+
+def warm_up():
+    """
+    Does the work of the first request before the server answers any: imports the views and loads the
+    dataset, with its indexes, and the population. Called by wsgi.py and asgi.py when COVID_PRELOAD is set,
+    under gunicorn --preload it runs once in the master and the forked workers share the pages.
+    """
+    get_resolver().url_patterns
+    try:
+        CovidService.dataset()
+    except sql.CasesNotLoaded:
+        # The workers load the table once the update loaded the cases into the database
+        pass
+    population.registry()
+    # The workers must not share the connections of the master
+    connections.close_all()
+    # What is loaded lives as long as the process. Frozen, the collector of each worker does not
+    # write to the headers of these objects, which would copy their pages into the worker
+    gc.freeze()
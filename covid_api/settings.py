@@ -16,7 +16,21 @@ import environ
 
 env = environ.Env(
     DEBUG=(bool, True),
-    SWAGGER_URL=(str, '')
+    SWAGGER_URL=(str, ''),
+    COVID_DATA_LOADING=(str, 'memory'),
+    COVID_DATA_URL=(str, 'https://sisa.msal.gov.ar/datos/descargas/covid-19/files/Covid19Casos.csv'),
+    COVID_SNAPSHOT_COLUMNS=(list, []),
+    COVID_INGEST_MEMORY_MB=(int, 512),
+    COVID_INGEST_MODE=(str, 'full'),
+    RESPONSE_CACHE_BYTES=(int, 64 * 1024 * 1024),
+    ASYNC_VIEWS=(bool, False),
+    ASYNC_VIEW_WORKERS=(int, 4),
+    COVID_QUERY_WORKERS=(int, 0),
+    COVID_QUERY_TIMEOUT=(float, 30.0),
+    PROFILE_SAMPLE_RATE=(float, 0.0),
+    PROFILE_MAX_DUMPS=(int, 100),
+    COVID_PRELOAD=(bool, False),
+    COVID_QUERY_BACKEND=(str, 'pandas'),
 )
 # reading .env file
 environ.Env.read_env()
@@ -59,7 +73,8 @@ INSTALLED_APPS = [
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
-    ]
+    ],
+    'EXCEPTION_HANDLER': 'covid_api.core.views.handle_exception',
 }
 
 # Database
@@ -87,6 +102,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'covid_api.core.middleware.DataVersionMiddleware',
+    'covid_api.core.middleware.MetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'covid_api.urls'
@@ -148,6 +165,49 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
-COVID_FILE_NAME = os.path.join(BASE_DIR, 'Covid19Casos.csv')
+COVID_DATA_URL = env('COVID_DATA_URL')
+COVID_FILE_NAME = env('COVID_FILE_NAME', default=os.path.join(BASE_DIR, 'Covid19Casos.csv'))
+# Population of the country and each province, compiled once into the snapshot directory
+POPULATION_FILE_NAME = os.path.join(BASE_DIR, 'poblacion.xls')
+# Columnar snapshots of COVID_FILE_NAME loaded by the API
+COVID_SNAPSHOT_DIR = env('COVID_SNAPSHOT_DIR', default=os.path.join(BASE_DIR, 'snapshots'))
+# How the snapshot is loaded:
+#   memory: each process reads its own copy of the snapshot
+#   mmap: the snapshot is memory mapped, the processes share the pages of the columns that need no conversion
+COVID_DATA_LOADING = env('COVID_DATA_LOADING')
+# Columns kept in the snapshot besides the ones the API queries, all the known columns if empty
+COVID_SNAPSHOT_COLUMNS = env('COVID_SNAPSHOT_COLUMNS')
+# Memory used by the chunks of the ingest
+COVID_INGEST_MEMORY_MB = env('COVID_INGEST_MEMORY_MB')
+# How a new file is ingested:
+#   full: the snapshot is rebuilt from the file
+#   incremental: the inserted and updated cases are found by their hashes and folded into a new snapshot
+COVID_INGEST_MODE = env('COVID_INGEST_MODE')
+# Bytes of rendered responses kept by the response cache, see core/cache.py
+RESPONSE_CACHE_BYTES = env('RESPONSE_CACHE_BYTES')
+# Serve async views, set by asgi.py. The pandas work runs in a pool of ASYNC_VIEW_WORKERS threads
+ASYNC_VIEWS = env('ASYNC_VIEWS')
+ASYNC_VIEW_WORKERS = env('ASYNC_VIEW_WORKERS')
+if ASYNC_VIEWS:
+    # WhiteNoise is a sync only middleware, it would serialise the async views. asgi.py serves the static files
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+# Where the queries of the cases run:
+#   pandas: on the data frames of the snapshot, loaded in each process
+#   sql: on the cases loaded into the database by the ingest, the processes do not hold them, see core/services/sql.py
+COVID_QUERY_BACKEND = env('COVID_QUERY_BACKEND')
+# Worker processes that run the summaries and the stats out of the GIL of the server, 0 runs them in the request.
+# They memory map the snapshot, see core/services/pool.py
+COVID_QUERY_WORKERS = env('COVID_QUERY_WORKERS')
+# Seconds a query may run in the workers before it is answered with a 503
+COVID_QUERY_TIMEOUT = env('COVID_QUERY_TIMEOUT')
+# Fraction of the requests profiled with cProfile and tracemalloc, see core/profiling.py.
+# Staff users can also profile a request with profile=true
+PROFILE_SAMPLE_RATE = env('PROFILE_SAMPLE_RATE')
+# Directory of the profiles, only the newest PROFILE_MAX_DUMPS are kept
+PROFILE_DIR = env('PROFILE_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+PROFILE_MAX_DUMPS = env('PROFILE_MAX_DUMPS')
+# Load the data when the server imports the application instead of on the first request, see core/warmup.py.
+# With gunicorn --preload it is loaded once in the master and shared by the workers it forks
+COVID_PRELOAD = env('COVID_PRELOAD')
 
 SWAGGER_URL = env('SWAGGER_URL', '')
\ No newline at end of file
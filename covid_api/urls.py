@@ -5,6 +5,8 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from covid_api.core import views
+from covid_api.core.urls import as_view
 from covid_api.settings import SWAGGER_URL
 
 repository = "https://github.com/alavarello/covid-api"
@@ -32,6 +34,8 @@ urlpatterns = [
     re_path(f'^{api_version}/redoc/$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
     re_path(f'^{api_version}/', include('covid_api.core.urls')),
     path('admin/', admin.site.urls),
+    # Probed by the load balancer, see ReadyView
+    re_path(r'^ready/?$', as_view(views.ReadyView, cheap=True), name='ready'),
     re_path('^', RedirectView.as_view(pattern_name='schema-swagger-ui', permanent=False)),
 ]
 
@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'covid_api.settings')
 
 application = get_wsgi_application()
+
+if settings.COVID_PRELOAD:
+    # Under gunicorn --preload the master loads the data and the workers it forks share it
+    from covid_api.core.warmup import warm_up
+    warm_up()